@@ -0,0 +1,110 @@
+import logging
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from api import cloudflare, firebase, interactions, leaderboard
+from api.models import BuddyRequest, PendingCloudflareDeletion, User, Video
+from api.neighbourhood import leave_neighbourhood
+from api.principals import forget_principal
+
+logger = logging.getLogger(__name__)
+
+DELETION_CHUNK_SIZE = 500
+
+
+def request_deletion(user):
+    """Deactivates the user at once, leaving delete_accounts to remove them.
+
+    They leave the leaderboard at the same time, so ranks agree with it.
+    """
+    with transaction.atomic():
+        points = (
+            User.objects.select_for_update()
+            .filter(pk=user.pk, is_active=True)
+            .values_list("points", flat=True)
+            .first()
+        )
+        if points is not None:
+            User.objects.filter(pk=user.pk).update(
+                is_active=False, deletion_requested_at=timezone.now()
+            )
+            leaderboard.move(points, 0)
+    forget_principal(user.username)
+    leaderboard.forget_snapshot()
+
+
+def delete_in_chunks(queryset, chunk_size):
+    """Deletes the rows of queryset, committing every chunk_size rows."""
+    deleted = 0
+    while True:
+        with transaction.atomic():
+            ids = list(queryset.values_list("pk", flat=True)[:chunk_size])
+            if not ids:
+                return deleted
+            queryset.model.objects.filter(pk__in=ids).delete()
+        deleted += len(ids)
+
+
+def delete_videos(user, chunk_size):
+    """Deletes the user's videos, and those starring them, from Cloudflare too.
+
+    Videos Cloudflare fails to delete are queued as orphans for
+    reconcile_cloudflare to retry.
+    """
+    deleted = 0
+    videos = Video.objects.filter(Q(creator=user) | Q(starring=user)).order_by("id")
+    while True:
+        chunk = list(videos.only("id", "cloudflare_uid")[:chunk_size])
+        if not chunk:
+            return deleted
+        errors = cloudflare.delete_videos([video.cloudflare_uid for video in chunk])
+        with transaction.atomic():
+            PendingCloudflareDeletion.objects.bulk_create(
+                [
+                    PendingCloudflareDeletion(cloudflare_uid=uid)
+                    for uid, error in errors.items()
+                    if error
+                ],
+                ignore_conflicts=True,
+            )
+            for video in chunk:
+                leave_neighbourhood(video)
+                video.delete()
+        deleted += len(chunk)
+
+
+def delete_account(user, chunk_size=DELETION_CHUNK_SIZE, progress=None):
+    """Removes a user whose deletion was requested, a chunk at a time.
+
+    Every chunk is committed on its own, so a run that stops part way is
+    picked up by the next one. progress is called with a description of
+    each step and the number of rows it removed.
+    """
+    progress = progress or (lambda step, count: None)
+    firebase.delete_user(user.username)
+    progress("videos", delete_videos(user, chunk_size))
+    progress(
+        "video interactions",
+        interactions.delete_user_interactions(user, chunk_size),
+    )
+    for step, queryset in [
+        (
+            "buddy requests",
+            BuddyRequest.objects.filter(Q(sender=user) | Q(receiver=user)),
+        ),
+        (
+            "buddies",
+            User.buddies.through.objects.filter(Q(from_user=user) | Q(to_user=user)),
+        ),
+        (
+            "blocked users",
+            User.blocked_users.through.objects.filter(
+                Q(from_user=user) | Q(to_user=user)
+            ),
+        ),
+        ("points ledger entries", user.points_ledger.all()),
+    ]:
+        progress(step, delete_in_chunks(queryset, chunk_size))
+    user.delete()
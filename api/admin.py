@@ -1,12 +1,17 @@
-import os
-
-import requests
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.contrib.admin import actions as admin_actions
+from django.core.exceptions import PermissionDenied
+from django.db.models import Q
+from django.http import HttpResponseRedirect
+from django.urls import reverse
 from django.utils.safestring import mark_safe
 from django.utils.translation import gettext_lazy as _
-from firebase_admin.auth import delete_user, delete_users
 
+from api import cloudflare, interactions
+from api.accounts import DELETION_CHUNK_SIZE
+from api.firebase import delete_user, delete_users
 from api.models import Video, User
+from api.neighbourhood import leave_and_delete, leave_neighbourhood
 
 
 class ReportedVideoListFilter(admin.SimpleListFilter):
@@ -36,14 +41,40 @@ class ReportedVideoListFilter(admin.SimpleListFilter):
         `self.value()`.
         """
         if self.value():
-            return queryset.filter(reported_by__isnull=False)
+            return queryset.filter(report_count__gt=0).order_by("-report_count")
+
+
+@admin.action(
+    permissions=["delete"],
+    description=_("Delete selected %(verbose_name_plural)s"),
+)
+def delete_selected(modeladmin, request, queryset):
+    """Django's delete_selected, leaving the outcome to delete_queryset.
+
+    The stock action reports every selected video as deleted, even those
+    Cloudflare could not delete. It still shows the confirmation page, and
+    any objects that are protected or that the user lacks permission to
+    delete.
+    """
+    if request.POST.get("post"):
+        _, _, perms_needed, protected = modeladmin.get_deleted_objects(
+            queryset, request
+        )
+        if perms_needed:
+            raise PermissionDenied
+        if not protected:
+            modeladmin.delete_queryset(request, queryset)
+            return None
+    return admin_actions.delete_selected(modeladmin, request, queryset)
 
 
 class VideoModelAdmin(admin.ModelAdmin):
     readonly_fields = ["creator", "display_video"]
     fields = ["creator", "display_video"]
     search_fields = ["id"]
+    list_display = ["__str__", "report_count", "hide_count", "directions_request_count"]
     list_filter = [ReportedVideoListFilter]
+    actions = [delete_selected]
 
     def has_add_permission(self, request, obj=None):
         return False
@@ -56,21 +87,48 @@ class VideoModelAdmin(admin.ModelAdmin):
         return mark_safe("<a href='%s' target='_blank' >View</a>" % url)
 
     def delete_model(self, request, obj):
-        headers = {
-            "Authorization": f"bearer {os.environ.get('CLOUDFLARE_API_TOKEN')}",
-        }
-        url = f"https://api.cloudflare.com/client/v4/accounts/{os.environ.get('CLOUDFLARE_ACCOUNT_ID')}/stream/{obj.cloudflare_uid}"
-        requests.request("DELETE", url, headers=headers)
+        error = cloudflare.delete_video(obj.cloudflare_uid)
+        if error:
+            self.message_user(
+                request,
+                f"Kept video {obj.id}, Cloudflare could not delete it: {error}",
+                messages.ERROR,
+            )
+            return
+        leave_neighbourhood(obj)
         super().delete_model(request, obj)
 
+    def response_delete(self, request, obj_display, obj_id):
+        if Video.objects.filter(pk=obj_id).exists():
+            # Kept because Cloudflare could not delete it, as delete_model
+            # has reported.
+            return HttpResponseRedirect(reverse("admin:api_video_changelist"))
+        return super().response_delete(request, obj_display, obj_id)
+
     def delete_queryset(self, request, queryset):
-        headers = {
-            "Authorization": f"bearer {os.environ.get('CLOUDFLARE_API_TOKEN')}",
-        }
-        for video in queryset.all():
-            url = f"https://api.cloudflare.com/client/v4/accounts/{os.environ.get('CLOUDFLARE_ACCOUNT_ID')}/stream/{video.cloudflare_uid}"
-            requests.request("DELETE", url, headers=headers)
-        super().delete_queryset(request, queryset)
+        videos = list(queryset)
+        errors = cloudflare.delete_videos([video.cloudflare_uid for video in videos])
+        # Rows are only deleted for videos that are gone from Cloudflare.
+        failed = []
+        for video in videos:
+            if errors[video.cloudflare_uid]:
+                failed.append(f"{video.id} ({errors[video.cloudflare_uid]})")
+                continue
+            self.log_deletion(request, video, str(video))
+            leave_neighbourhood(video)
+            video.delete()
+        self.message_user(
+            request,
+            f"Deleted {len(videos) - len(failed)} of {len(videos)} videos from Cloudflare.",
+            messages.SUCCESS if not failed else messages.WARNING,
+        )
+        if failed:
+            self.message_user(
+                request,
+                f"Kept {len(failed)} videos Cloudflare could not delete: "
+                + ", ".join(failed),
+                messages.ERROR,
+            )
 
     display_video.short_description = "Video"
 
@@ -86,11 +144,21 @@ class UserModelAdmin(admin.ModelAdmin):
 
     def delete_model(self, request, obj):
         delete_user(obj.username)
+        # Videos and interactions would otherwise go in the cascade, leaving
+        # their neighbours' creators_nearby and other videos' interaction
+        # counters counting them.
+        leave_and_delete(Video.objects.filter(Q(creator=obj) | Q(starring=obj)))
+        interactions.delete_user_interactions(obj, DELETION_CHUNK_SIZE)
         super().delete_model(request, obj)
 
     def delete_queryset(self, request, queryset):
-        users = [user.username for user in queryset.all()]
-        delete_users(users)
+        users = list(queryset.all())
+        delete_users([user.username for user in users])
+        leave_and_delete(
+            Video.objects.filter(Q(creator__in=users) | Q(starring__in=users))
+        )
+        for user in users:
+            interactions.delete_user_interactions(user, DELETION_CHUNK_SIZE)
         super().delete_queryset(request, queryset)
 
 
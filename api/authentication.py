@@ -1,30 +1,68 @@
+import hashlib
 import logging
 import os
+import threading
+import time
+from collections import OrderedDict
 
-import firebase_admin
-from firebase_admin import credentials, auth
+import jwt
 from rest_framework import authentication
 
 from api.exceptions import InvalidAuthToken, FirebaseError, NoAuthToken
-from api.models import User
+from api.principals import principal
+from api.tokens import FirebaseTokenVerifier
 
 logger = logging.getLogger(__name__)
-cred = credentials.Certificate(
-    {
-        "type": "service_account",
-        "project_id": os.environ.get("FIREBASE_PROJECT_ID"),
-        "private_key_id": os.environ.get("FIREBASE_PRIVATE_KEY_ID"),
-        "private_key": os.environ.get("FIREBASE_PRIVATE_KEY").replace("\\n", "\n"),
-        "client_email": os.environ.get("FIREBASE_CLIENT_EMAIL"),
-        "client_id": os.environ.get("FIREBASE_CLIENT_ID"),
-        "auth_uri": "https://accounts.google.com/o/oauth2/auth",
-        "token_uri": "https://accounts.google.com/o/oauth2/token",
-        "auth_provider_x509_cert_url": "https://www.googleapis.com/oauth2/v1/certs",
-        "client_x509_cert_url": os.environ.get("FIREBASE_CLIENT_CERT_URL"),
-    }
-)
 
-default_app = firebase_admin.initialize_app(cred)
+
+class VerifiedTokenCache:
+    """Decoded ID tokens by token hash, kept until they expire."""
+
+    def __init__(self, max_size=10000, report_every=10000):
+        self.max_size = max_size
+        self.report_every = report_every
+        self.tokens = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(token):
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token):
+        key = self.key(token)
+        with self.lock:
+            decoded_token = self.tokens.get(key)
+            if decoded_token and decoded_token["exp"] <= time.time():
+                del self.tokens[key]
+                decoded_token = None
+            if decoded_token:
+                self.tokens.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+            if (self.hits + self.misses) % self.report_every == 0:
+                logger.info(
+                    "Verified token cache: %s hits, %s misses, %s tokens",
+                    self.hits,
+                    self.misses,
+                    len(self.tokens),
+                )
+        return decoded_token
+
+    def set(self, token, decoded_token):
+        with self.lock:
+            self.tokens[self.key(token)] = decoded_token
+            if len(self.tokens) > self.max_size:
+                self.tokens.popitem(last=False)
+
+
+verified_tokens = VerifiedTokenCache()
+firebase_tokens = FirebaseTokenVerifier(
+    os.environ.get("FIREBASE_PROJECT_ID"),
+    keys_file=os.environ.get("FIREBASE_PUBLIC_KEYS_FILE"),
+)
 
 
 class FirebaseAuthentication(authentication.BaseAuthentication):
@@ -33,20 +71,19 @@ class FirebaseAuthentication(authentication.BaseAuthentication):
         if not auth_header:
             raise NoAuthToken()
         token = auth_header.split(" ").pop()
-        try:
-            decoded_token = auth.verify_id_token(token)
-        except auth.RevokedIdTokenError as exc:
-            raise InvalidAuthToken(str(exc))
-        except auth.UserDisabledError as exc:
-            raise InvalidAuthToken(str(exc))
-        except auth.InvalidIdTokenError as exc:
-            raise InvalidAuthToken(str(exc))
+        decoded_token = verified_tokens.get(token)
+        if not decoded_token:
+            try:
+                decoded_token = firebase_tokens.verify(token)
+            except jwt.PyJWTError as exc:
+                raise InvalidAuthToken(str(exc))
+            verified_tokens.set(token, decoded_token)
 
         try:
             uid = decoded_token.get("uid")
         except Exception:
             raise FirebaseError("Missing uid.")
-        user, created = User.objects.get_or_create(
-            username=uid,
-        )
-        return user, None
+        user = principal(uid)
+        if user is None:
+            raise InvalidAuthToken("User is deactivated.")
+        return user, decoded_token
@@ -0,0 +1,148 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+CLOUDFLARE_API_URL = "https://api.cloudflare.com/client/v4"
+# Seconds to wait for a connection and then for each read of the response.
+TIMEOUT = (3.05, 10)
+LIST_PAGE_SIZE = 1000
+DELETE_WORKERS = 8
+# Cloudflare allows 1,200 API requests per five minutes. Deletes may burst to
+# half of that before being held to the sustained rate.
+DELETE_RATE = 4
+DELETE_BURST = 600
+# Failed connections are retried for any request, as nothing was sent. Error
+# responses and read timeouts are only retried for idempotent requests, as a
+# retried upload POST could leave an orphaned upload URL behind.
+RETRIES = Retry(
+    total=3,
+    backoff_factor=0.5,
+    backoff_jitter=0.5,
+    status_forcelist=(429, 500, 502, 503, 504),
+    allowed_methods=frozenset({"GET", "DELETE"}),
+    raise_on_status=False,
+)
+
+
+class RateLimiter:
+    """Token bucket shared by all threads of a worker."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.burst, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+            # Going into debt reserves the caller a slot in the future.
+            self.tokens -= 1
+            wait = -self.tokens / self.rate
+        if wait > 0:
+            time.sleep(wait)
+
+
+class CloudflareStream:
+    """Cloudflare Stream API client, keeping connections open between calls."""
+
+    def __init__(self, account_id, api_token, api_url=CLOUDFLARE_API_URL):
+        self.account_url = f"{api_url}/accounts/{account_id}/stream"
+        self.session = requests.Session()
+        self.session.headers["Authorization"] = f"bearer {api_token}"
+        adapter = HTTPAdapter(pool_maxsize=10, max_retries=RETRIES)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def request(self, method, path="", **kwargs):
+        return self.session.request(
+            method, f"{self.account_url}{path}", timeout=TIMEOUT, **kwargs
+        )
+
+    def create_direct_upload(self, upload_length, upload_metadata):
+        return self.request(
+            "POST",
+            "?direct_user=true",
+            headers={
+                "Tus-Resumable": "1.0.0",
+                "Upload-Length": upload_length,
+                "Upload-Metadata": upload_metadata,
+            },
+        )
+
+    def delete_video(self, uid):
+        return self.request("DELETE", f"/{uid}")
+
+    def video_pages(self, page_size=LIST_PAGE_SIZE):
+        """Every video in the account, oldest first, a page at a time."""
+        start, boundary = None, set()
+        while True:
+            # start is inclusive, so the videos created at the boundary of
+            # the previous page come back again and are skipped.
+            params = {"asc": "true", "limit": page_size + len(boundary)}
+            if start:
+                params["start"] = start
+            response = self.request("GET", params=params)
+            response.raise_for_status()
+            page = [
+                video
+                for video in response.json()["result"]
+                if video["uid"] not in boundary
+            ]
+            if not page:
+                return
+            yield page
+            if page[-1]["created"] != start:
+                start, boundary = page[-1]["created"], set()
+            boundary |= {video["uid"] for video in page if video["created"] == start}
+
+
+client = CloudflareStream(
+    os.environ.get("CLOUDFLARE_ACCOUNT_ID"),
+    os.environ.get("CLOUDFLARE_API_TOKEN"),
+    os.environ.get("CLOUDFLARE_API_URL") or CLOUDFLARE_API_URL,
+)
+
+delete_limiter = RateLimiter(DELETE_RATE, DELETE_BURST)
+
+
+def delete_video(uid):
+    """Deletes a video from Cloudflare, returning why it failed, if it did."""
+    delete_limiter.acquire()
+    try:
+        response = client.delete_video(uid)
+    except requests.RequestException as exc:
+        return str(exc)
+    # A video that is already gone has nothing left to delete.
+    if response.ok or response.status_code == 404:
+        return None
+    return f"Cloudflare responded {response.status_code}"
+
+
+def delete_videos(uids, workers=DELETE_WORKERS):
+    """Deletes videos from Cloudflare in parallel.
+
+    Returns each uid mapped to why its deletion failed, or None if it was
+    deleted.
+    """
+    errors = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(delete_video, uid): uid for uid in uids}
+        for done, future in enumerate(as_completed(futures), 1):
+            errors[futures[future]] = future.result()
+            if done % 50 == 0:
+                logger.info("Deleted %s of %s videos from Cloudflare", done, len(uids))
+    return errors
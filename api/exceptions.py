@@ -18,3 +18,9 @@ class FirebaseError(APIException):
     status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
     default_detail = "The user provided with the auth token is not a valid Firebase user, it has no Firebase UID"
     default_code = "no_firebase_uid"
+
+
+class CloudflareUnavailable(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Video uploads are unavailable, please try again later"
+    default_code = "cloudflare_unavailable"
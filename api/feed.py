@@ -0,0 +1,282 @@
+import datetime
+import math
+import uuid
+
+from django.contrib.gis.db.models import PointField
+from django.contrib.gis.db.models.functions import Distance
+from django.contrib.gis.geos import Point
+from django.core import signing
+from django.core.cache import cache, caches
+from django.db import transaction
+from django.db.models import F, FloatField, Func, Q, Subquery, Value
+from django.db.models.functions import Cast
+
+from api import leaderboard
+from api.models import Video, VideoInteraction
+
+FEED_PAGE_SIZE = 5
+# Number of nearest videos pulled off the spatial index before the exact
+# spheroid distance and the full feed ordering are applied.
+KNN_CANDIDATES = 100
+# The index orders by sphere distance while the feed orders by spheroid
+# distance. The two differ by well under 1%, so widen seeks by that much.
+SPHERE_TOLERANCE = 0.01
+CURSOR_SALT = "api.feed.cursor"
+CREATOR_CURSOR_SALT = "api.feed.creator_cursor"
+CREATOR_PAGE_MAX = 1000
+# Feeds are served from the nearest videos to the centre of a grid cell,
+# cached per worker until the set of videos changes.
+CELL_DEGREES = 0.01
+CELL_CANDIDATES = 200
+# Furthest a point in a cell can be from its centre, in metres. A degree of
+# latitude is at most 111.7 km and a degree of longitude no more than that.
+CELL_HALF_DIAGONAL = CELL_DEGREES / 2 * math.sqrt(2) * 111_700
+VIDEO_SET_VERSION_KEY = "feed-video-set-version"
+
+
+def as_geography(expression):
+    return Cast(expression, output_field=PointField(geography=True))
+
+
+class KNNDistance(Func):
+    """PostGIS `<->` distance operator, driven by a GiST index in ORDER BY."""
+
+    arg_joiner = " <-> "
+    template = "(%(expressions)s)"
+    output_field = FloatField()
+
+
+def knn_distance(current_location):
+    return KNNDistance(
+        as_geography("location"),
+        Value(current_location, output_field=PointField(geography=True)),
+    )
+
+
+def exclusions_key(user_id):
+    return f"feed-exclusions-{user_id}"
+
+
+def exclusions_version_key(user_id):
+    return f"feed-exclusions-version-{user_id}"
+
+
+def feed_exclusions(user):
+    """The videos and creators left out of the user's feed, cached.
+
+    The set is stored with the version of the user's exclusions it was read
+    under. Writes bump the version once they commit, so a set read while a
+    write was in flight is never served after it.
+    """
+    exclusions_cache = caches["exclusions"]
+    key, version_key = exclusions_key(user.pk), exclusions_version_key(user.pk)
+    cached = exclusions_cache.get_many([key, version_key])
+    version = cached.get(version_key)
+    if version is None:
+        exclusions_cache.add(version_key, uuid.uuid4().hex, None)
+        version = exclusions_cache.get(version_key)
+    if key in cached and cached[key]["version"] == version:
+        return cached[key]
+    video_ids = VideoInteraction.objects.filter(
+        user=user,
+        kind__in=[VideoInteraction.Kind.REPORTED, VideoInteraction.Kind.HIDDEN],
+    ).values_list("video_id", flat=True)
+    exclusions = {
+        "version": version,
+        "videos": set(video_ids),
+        "creators": set(user.blocked_users.values_list("id", flat=True)),
+    }
+    exclusions_cache.set(key, exclusions)
+    return exclusions
+
+
+def forget_exclusions(*users):
+    # blocked_users is symmetrical, so blocks are forgotten for both sides.
+    # The sets are dropped at once for reads in this transaction, and the
+    # versions bumped once it commits for reads that raced it.
+    exclusions_cache = caches["exclusions"]
+    exclusions_cache.delete_many([exclusions_key(user.pk) for user in users])
+    versions = [exclusions_version_key(user.pk) for user in users]
+    transaction.on_commit(
+        lambda: exclusions_cache.set_many(
+            {key: uuid.uuid4().hex for key in versions}, None
+        )
+    )
+
+
+def excluded(exclusions):
+    condition = Q()
+    if exclusions["videos"]:
+        condition |= Q(id__in=exclusions["videos"])
+    if exclusions["creators"]:
+        condition |= Q(creator_id__in=exclusions["creators"])
+    return condition
+
+
+def encode_cursor(video):
+    return signing.dumps(
+        [
+            video.distance.m,
+            video.creator_points,
+            video.uploaded_at.isoformat(),
+            str(video.id),
+        ],
+        salt=CURSOR_SALT,
+        compress=True,
+    )
+
+
+def decode_cursor(cursor):
+    distance, creator_points, uploaded_at, video_id = signing.loads(
+        cursor, salt=CURSOR_SALT
+    )
+    return (
+        distance,
+        creator_points,
+        datetime.datetime.fromisoformat(uploaded_at),
+        video_id,
+    )
+
+
+def after_cursor(cursor):
+    distance, creator_points, uploaded_at, video_id = cursor
+    return (
+        Q(distance__gt=distance)
+        | Q(distance=distance, creator_points__lt=creator_points)
+        | Q(
+            distance=distance,
+            creator_points=creator_points,
+            uploaded_at__lt=uploaded_at,
+        )
+        | Q(
+            distance=distance,
+            creator_points=creator_points,
+            uploaded_at=uploaded_at,
+            id__gt=video_id,
+        )
+    )
+
+
+def video_set_version():
+    return cache.get_or_set(VIDEO_SET_VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def bump_video_set_version():
+    cache.set(VIDEO_SET_VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def cell_candidates(current_location):
+    latitude_cell = math.floor(current_location.y / CELL_DEGREES)
+    longitude_cell = math.floor(current_location.x / CELL_DEGREES)
+    key = f"feed-cell-{video_set_version()}-{latitude_cell}-{longitude_cell}"
+    cell = caches["feed"].get(key)
+    if cell is None:
+        centre = Point(
+            max(-180, min(180, (longitude_cell + 0.5) * CELL_DEGREES)),
+            max(-90, min(90, (latitude_cell + 0.5) * CELL_DEGREES)),
+            srid=4326,
+        )
+        nearest = list(
+            Video.objects.annotate(knn_distance=knn_distance(centre))
+            .order_by("knn_distance")
+            .values_list("id", "knn_distance")[:CELL_CANDIDATES]
+        )
+        cell = {
+            "ids": [video_id for video_id, _ in nearest],
+            "radius": nearest[-1][1] if nearest else 0,
+            "complete": len(nearest) < CELL_CANDIDATES,
+        }
+        caches["feed"].set(key, cell)
+    return cell
+
+
+def ranked(videos, current_location, seek):
+    return list(
+        videos.select_related("starring")
+        .annotate(
+            distance=Distance("location", current_location, spheroid=True),
+            creator_points=F("creator__points"),
+            starring_rank=leaderboard.rank_of("starring__points"),
+        )
+        .filter(seek)
+        .order_by(
+            "distance",
+            "-creator_points",
+            "-uploaded_at",
+            "id",
+        )[:FEED_PAGE_SIZE]
+    )
+
+
+def nearest_videos(user, current_location, after_video=None, cursor=None):
+    seek, seek_distance = Q(), 0
+    if cursor:
+        seek, seek_distance = after_cursor(cursor), cursor[0]
+    elif after_video:
+        after_distance = (
+            Video.objects.filter(id=after_video)
+            .annotate(distance=Distance("location", current_location, spheroid=True))
+            .values_list("distance", flat=True)
+            .get()
+        )
+        seek, seek_distance = Q(distance__gt=after_distance), after_distance.m
+    exclusions = feed_exclusions(user)
+
+    # Every video within safe_distance of the user is in the cell's list, so a
+    # page that ends inside it is exactly the page the database would return.
+    cell = cell_candidates(current_location)
+    safe_distance = cell["radius"] * (1 - SPHERE_TOLERANCE) - CELL_HALF_DIAGONAL
+    if cell["complete"] or seek_distance <= safe_distance:
+        videos = ranked(
+            Video.objects.filter(id__in=cell["ids"]).exclude(excluded(exclusions)),
+            current_location,
+            seek,
+        )
+        if cell["complete"] or (
+            len(videos) == FEED_PAGE_SIZE and videos[-1].distance.m <= safe_distance
+        ):
+            return videos
+
+    # Exact distances are only computed for the candidates nearest by index.
+    # Should more than KNN_CANDIDATES videos share one spot, the tie-breaks on
+    # creator points and upload time only see the candidates that were pulled.
+    candidates = (
+        Video.objects.exclude(excluded(exclusions))
+        .alias(knn_distance=knn_distance(current_location))
+        .filter(knn_distance__gte=seek_distance * (1 - SPHERE_TOLERANCE))
+        .order_by("knn_distance")
+        .values("id")[:KNN_CANDIDATES]
+    )
+    return ranked(
+        Video.objects.filter(id__in=Subquery(candidates)), current_location, seek
+    )
+
+
+def encode_creator_cursor(creator_id, video):
+    return signing.dumps(
+        [creator_id, video["uploaded_at"].isoformat(), str(video["id"])],
+        salt=CREATOR_CURSOR_SALT,
+    )
+
+
+def decode_creator_cursor(cursor):
+    creator_id, uploaded_at, video_id = signing.loads(cursor, salt=CREATOR_CURSOR_SALT)
+    return creator_id, datetime.datetime.fromisoformat(uploaded_at), video_id
+
+
+def creator_video_ids(creator, since=None, cursor=None, limit=None):
+    """Ids and upload times of a creator's videos, newest first.
+
+    Only videos uploaded after since, and after cursor when paging, are
+    included. Read from the video_creator_uploaded index.
+    """
+    videos = Video.objects.filter(creator=creator).order_by("-uploaded_at", "-id")
+    if since:
+        videos = videos.filter(uploaded_at__gt=since)
+    if cursor:
+        _, uploaded_at, video_id = cursor
+        videos = videos.filter(
+            Q(uploaded_at__lt=uploaded_at) | Q(uploaded_at=uploaded_at, id__lt=video_id)
+        )
+    videos = videos.values("id", "uploaded_at")
+    return list(videos[:limit] if limit else videos)
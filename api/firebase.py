@@ -0,0 +1,70 @@
+import os
+import threading
+
+from django.core.cache import caches
+
+# firebase_admin and its Google client libraries take longer to import than
+# the rest of the app, so they are only imported once a worker needs them.
+lock = threading.Lock()
+EMAIL_VERIFIED_TIMEOUT = 60
+
+
+def firebase_app():
+    """The default Firebase app, initialised on first use."""
+    import firebase_admin
+    from firebase_admin import credentials
+
+    with lock:
+        try:
+            return firebase_admin.get_app()
+        except ValueError:
+            pass
+        cred = credentials.Certificate(
+            {
+                "type": "service_account",
+                "project_id": os.environ.get("FIREBASE_PROJECT_ID"),
+                "private_key_id": os.environ.get("FIREBASE_PRIVATE_KEY_ID"),
+                "private_key": os.environ.get("FIREBASE_PRIVATE_KEY").replace(
+                    "\\n", "\n"
+                ),
+                "client_email": os.environ.get("FIREBASE_CLIENT_EMAIL"),
+                "client_id": os.environ.get("FIREBASE_CLIENT_ID"),
+                "auth_uri": "https://accounts.google.com/o/oauth2/auth",
+                "token_uri": "https://accounts.google.com/o/oauth2/token",
+                "auth_provider_x509_cert_url": "https://www.googleapis.com/oauth2/v1/certs",
+                "client_x509_cert_url": os.environ.get("FIREBASE_CLIENT_CERT_URL"),
+            }
+        )
+        return firebase_admin.initialize_app(cred)
+
+
+def get_user(uid):
+    from firebase_admin import auth
+
+    return auth.get_user(uid, app=firebase_app())
+
+
+def delete_user(uid):
+    """Deletes the Firebase user, unless it has already been deleted."""
+    from firebase_admin import auth
+
+    try:
+        auth.delete_user(uid, app=firebase_app())
+    except auth.UserNotFoundError:
+        pass
+
+
+def delete_users(uids):
+    from firebase_admin import auth
+
+    return auth.delete_users(uids, app=firebase_app())
+
+
+def email_verified(uid):
+    """Whether the user's email address is verified, as of the last minute."""
+    key = f"firebase-email-verified-{uid}"
+    verified = caches["firebase"].get(key)
+    if verified is None:
+        verified = get_user(uid).email_verified
+        caches["firebase"].set(key, verified, EMAIL_VERIFIED_TIMEOUT)
+    return verified
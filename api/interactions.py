@@ -0,0 +1,264 @@
+from django.db import connection, transaction
+from django.db.models import Count, F, Q
+
+from api import points
+from api.feed import forget_exclusions
+from api.models import (
+    PointsLedgerEntry,
+    ReportNotification,
+    User,
+    Video,
+    VideoInteraction,
+)
+
+INTERACTIONS = VideoInteraction._meta.db_table
+VIDEOS = Video._meta.db_table
+# Batch actions, with the interactions they record.
+ACTIONS = {
+    "hide": VideoInteraction.Kind.HIDDEN,
+    "report": VideoInteraction.Kind.REPORTED,
+    "went": VideoInteraction.Kind.DIRECTIONS_REQUESTED,
+}
+COUNTERS = {
+    VideoInteraction.Kind.REPORTED: "report_count",
+    VideoInteraction.Kind.HIDDEN: "hide_count",
+    VideoInteraction.Kind.DIRECTIONS_REQUESTED: "directions_request_count",
+}
+
+
+def count_changes(changed, uncount=False):
+    """CTEs adding the interactions in `changed` to the counters of their videos.
+
+    With uncount, they are subtracted instead, never taking a counter below
+    zero.
+    """
+    counts = ", ".join(
+        f"count(*) FILTER (WHERE kind = '{kind}') AS {column}"
+        for kind, column in COUNTERS.items()
+    )
+    template = "GREATEST({} - {}, 0)" if uncount else "{} + {}"
+    updates = ", ".join(
+        f"{column} = " + template.format(f"{VIDEOS}.{column}", f"changes.{column}")
+        for column in COUNTERS.values()
+    )
+    return f"""
+        changes AS (
+            SELECT video_id, {counts} FROM {changed} GROUP BY video_id
+        ),
+        counted AS (
+            UPDATE {VIDEOS} SET {updates}
+            FROM changes WHERE {VIDEOS}.id = changes.video_id
+        )
+    """
+
+
+# Records interactions of a user, skipping any they already had. New ones are
+# counted on their videos, and new reports queued for the moderation digest.
+RECORD = f"""
+    WITH recorded AS (
+        INSERT INTO {INTERACTIONS} (user_id, video_id, kind)
+        SELECT %(user)s, video_id, kind
+        FROM unnest(%(videos)s::uuid[], %(kinds)s::varchar[]) AS new (video_id, kind)
+        ON CONFLICT (user_id, video_id, kind) DO NOTHING
+        RETURNING video_id, kind
+    ),
+    {count_changes("recorded")},
+    notified AS (
+        INSERT INTO {ReportNotification._meta.db_table} (video_id, reported_at)
+        SELECT video_id, now() FROM recorded
+        WHERE kind = '{VideoInteraction.Kind.REPORTED}'
+    )
+    SELECT video_id, kind FROM recorded
+"""
+# Deletes a chunk of a user's interactions, uncounting them from their videos.
+DELETE_USER_INTERACTIONS = f"""
+    WITH deleted AS (
+        DELETE FROM {INTERACTIONS} WHERE id IN (
+            SELECT id FROM {INTERACTIONS} WHERE user_id = %(user)s LIMIT %(limit)s
+        )
+        RETURNING video_id, kind
+    ),
+    {count_changes("deleted", uncount=True)}
+    SELECT count(*) FROM deleted
+"""
+
+
+def record_many(user, interactions):
+    """Records the user's (video, kind) interactions in one statement.
+
+    Returns the (video id, kind) pairs that were new, with ids as strings.
+    """
+    if not interactions:
+        return set()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            RECORD,
+            {
+                "user": user.pk,
+                "videos": [str(video.pk) for video, _ in interactions],
+                "kinds": [str(kind) for _, kind in interactions],
+            },
+        )
+        return {(str(video_id), kind) for video_id, kind in cursor.fetchall()}
+
+
+def record(user, video, kind):
+    """Records the user's interaction with the video, returning whether it is new."""
+    return bool(record_many(user, [(video, kind)]))
+
+
+def hide(user, video):
+    return record(user, video, VideoInteraction.Kind.HIDDEN)
+
+
+def directions_award(user, video):
+    """The points award for the user requesting directions to the video, if any."""
+    if video.creator_id == user.pk:
+        return None
+    num_creators_around = 1 + video.creators_nearby
+    return (
+        [User(pk=video.creator_id), User(pk=video.starring_id)],
+        10 * num_creators_around,
+        video,
+    )
+
+
+def award_directions(awards):
+    points.award_many(
+        [award for award in awards if award],
+        PointsLedgerEntry.Reason.DIRECTIONS_REQUESTED,
+    )
+
+
+def request_directions(user, video):
+    """Records the request, awarding the video's creator and star the first time."""
+    with transaction.atomic():
+        new = record(user, video, VideoInteraction.Kind.DIRECTIONS_REQUESTED)
+        if new:
+            award_directions([directions_award(user, video)])
+    return new
+
+
+def block(user, *blocked_users):
+    # blocked_users is symmetrical, so both directions are stored.
+    Blocked = User.blocked_users.through
+    Blocked.objects.bulk_create(
+        [
+            Blocked(from_user_id=from_user.pk, to_user_id=to_user.pk)
+            for blocked_user in blocked_users
+            for from_user, to_user in [(user, blocked_user), (blocked_user, user)]
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def apply(user, actions):
+    """Applies (video id, action) pairs a client queued, in bulk.
+
+    Each action has the effects and points of its single action endpoint.
+    Returns a result for each pair: recorded, unchanged, or not_found or
+    invalid when nothing was done.
+    """
+    videos = {
+        str(video.pk): video
+        for video in Video.objects.only(
+            "id", "creator_id", "starring_id", "creators_nearby"
+        ).filter(pk__in={video_id for video_id, _ in actions})
+    }
+    failed = {}
+    recordable = {}
+    blocked = set()
+    for video_id, action in actions:
+        video = videos.get(str(video_id))
+        if video is None:
+            failed[(str(video_id), action)] = "not_found"
+        elif action != "block":
+            recordable[(str(video.pk), str(ACTIONS[action]))] = video
+        elif video.creator_id == user.pk:
+            failed[(str(video_id), action)] = "invalid"
+        else:
+            blocked.add(video.creator_id)
+    already_blocked = set(
+        user.blocked_users.filter(id__in=blocked).values_list("id", flat=True)
+    )
+    with transaction.atomic():
+        new = record_many(
+            user, [(video, kind) for (_, kind), video in recordable.items()]
+        )
+        award_directions(
+            directions_award(user, videos[video_id])
+            for video_id, kind in new
+            if kind == VideoInteraction.Kind.DIRECTIONS_REQUESTED
+        )
+        block(user, *[User(pk=creator_id) for creator_id in blocked - already_blocked])
+    forget_exclusions(user, *[User(pk=creator_id) for creator_id in blocked])
+    results = []
+    for video_id, action in actions:
+        video_id = str(video_id)
+        if (video_id, action) in failed:
+            results.append(failed[(video_id, action)])
+        elif action == "block":
+            creator_id = videos[video_id].creator_id
+            results.append("unchanged" if creator_id in already_blocked else "recorded")
+        else:
+            new_kind = (video_id, str(ACTIONS[action])) in new
+            results.append("recorded" if new_kind else "unchanged")
+    return results
+
+
+def delete_user_interactions(user, chunk_size):
+    """Deletes the user's interactions, committing every chunk_size rows."""
+    deleted = 0
+    while True:
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                DELETE_USER_INTERACTIONS, {"user": user.pk, "limit": chunk_size}
+            )
+            (chunk,) = cursor.fetchone()
+        if not chunk:
+            return deleted
+        deleted += chunk
+
+
+def mismatched_counts():
+    """Videos whose interaction counters differ from their interaction rows.
+
+    Each comes with its actual counts, as actual_report_count and so on.
+    """
+    actual_counts = {
+        f"actual_{column}": Count("interactions", filter=Q(interactions__kind=kind))
+        for kind, column in COUNTERS.items()
+    }
+    mismatched = Q()
+    for column in COUNTERS.values():
+        mismatched |= ~Q(**{column: F(f"actual_{column}")})
+    return (
+        Video.objects.only("id", *COUNTERS.values())
+        .annotate(**actual_counts)
+        .filter(mismatched)
+    )
+
+
+def recount(videos):
+    """Sets the interaction counters of the videos from their interaction rows."""
+    counts = ", ".join(
+        f"count(*) FILTER (WHERE interaction.kind = '{kind}') AS {column}"
+        for kind, column in COUNTERS.items()
+    )
+    updates = ", ".join(f"{column} = counted.{column}" for column in COUNTERS.values())
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            UPDATE {VIDEOS} SET {updates}
+            FROM (
+                SELECT video.id, {counts}
+                FROM {VIDEOS} AS video
+                LEFT JOIN {INTERACTIONS} AS interaction
+                ON interaction.video_id = video.id
+                WHERE video.id = ANY(%(videos)s::uuid[])
+                GROUP BY video.id
+            ) AS counted
+            WHERE {VIDEOS}.id = counted.id
+            """,
+            {"videos": [str(video.id) for video in videos]},
+        )
@@ -0,0 +1,183 @@
+import time
+from collections import Counter
+
+from django.core import signing
+from django.core.cache import cache
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F, Func, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from api.models import PointsBucket, User
+
+LEADERBOARD_PAGE_SIZE = 20
+# The front pages are served from a snapshot refreshed every SNAPSHOT_TIMEOUT
+# seconds instead of being read from the users table per request. Only the
+# worker holding SNAPSHOT_LOCK_KEY refreshes it, the rest serve the old one.
+SNAPSHOT_SIZE = 100
+SNAPSHOT_TIMEOUT = 30
+SNAPSHOT_KEY = "leaderboard-snapshot"
+SNAPSHOT_LOCK_KEY = "leaderboard-snapshot-lock"
+CURSOR_SALT = "api.leaderboard.cursor"
+
+# Users on 0 points never rank above anyone, so they are left out of the
+# histogram and only totals above 0 have a bucket.
+
+
+def move(old_points, new_points):
+    if old_points == new_points:
+        return
+    if old_points:
+        PointsBucket.objects.filter(points=old_points).update(users=F("users") - 1)
+    if new_points:
+        bucket = PointsBucket.objects.filter(points=new_points)
+        if not bucket.update(users=F("users") + 1):
+            try:
+                with transaction.atomic():
+                    PointsBucket.objects.create(points=new_points, users=1)
+            except IntegrityError:
+                bucket.update(users=F("users") + 1)
+
+
+def move_many(moves):
+    """Moves users between buckets in one statement, given (old, new) points."""
+    changes = Counter()
+    for old_points, new_points in moves:
+        if old_points == new_points:
+            continue
+        if old_points:
+            changes[old_points] -= 1
+        if new_points:
+            changes[new_points] += 1
+    changes = {points: users for points, users in changes.items() if users}
+    if not changes:
+        return
+    table = PointsBucket._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} (points, users) "
+            "SELECT * FROM unnest(%s::bigint[], %s::integer[]) "
+            f"ON CONFLICT (points) DO UPDATE SET users = {table}.users + EXCLUDED.users",
+            [list(changes), list(changes.values())],
+        )
+
+
+def rank(points):
+    ranked_above = PointsBucket.objects.filter(points__gt=points).aggregate(
+        users=Sum("users")
+    )["users"]
+    return (ranked_above or 0) + 1
+
+
+def rank_of(points_field):
+    ranked_above = (
+        PointsBucket.objects.filter(points__gt=OuterRef(points_field))
+        .order_by()
+        .annotate(users_above=Func(F("users"), function="SUM"))
+        .values("users_above")
+    )
+    return Coalesce(Subquery(ranked_above), Value(0)) + 1
+
+
+def rebuild():
+    with transaction.atomic():
+        # Hold back concurrent moves so none are lost or counted twice.
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"LOCK TABLE {PointsBucket._meta.db_table} IN EXCLUSIVE MODE"
+            )
+        PointsBucket.objects.all().delete()
+        buckets = PointsBucket.objects.bulk_create(
+            PointsBucket(points=bucket["points"], users=bucket["users"])
+            for bucket in User.objects.filter(points__gt=0, is_active=True)
+            .order_by()
+            .values("points")
+            .annotate(users=Count("id"))
+        )
+    return len(buckets)
+
+
+def encode_cursor(entry):
+    return signing.dumps(
+        [entry["points"], entry["id"], entry["rank"], entry["index"]],
+        salt=CURSOR_SALT,
+    )
+
+
+def decode_cursor(cursor):
+    points, user_id, rank, index = signing.loads(cursor, salt=CURSOR_SALT)
+    return {"points": points, "id": user_id, "rank": rank, "index": index}
+
+
+def with_ranks(users, after=None):
+    # Users are in descending points order, so a user's rank is their position
+    # unless they tie on points with the user before them.
+    points, rank, index = (
+        (after["points"], after["rank"], after["index"]) if after else (None, 0, -1)
+    )
+    for user in users:
+        index += 1
+        if user["points"] != points:
+            points, rank = user["points"], index + 1
+        yield {**user, "rank": rank, "index": index}
+
+
+def ranked_users(after=None):
+    users = (
+        User.objects.filter(is_active=True)
+        .order_by("-points", "id")
+        .values("id", "username", "display_name", "points")
+    )
+    if after:
+        users = users.filter(
+            Q(points__lt=after["points"])
+            | Q(points=after["points"], id__gt=after["id"])
+        )
+    return users
+
+
+def refresh_snapshot():
+    entries = list(with_ranks(ranked_users()[:SNAPSHOT_SIZE]))
+    cache.set(
+        SNAPSHOT_KEY,
+        {"entries": entries, "refresh_at": time.time() + SNAPSHOT_TIMEOUT},
+        None,
+    )
+    return entries
+
+
+def forget_snapshot():
+    cache.delete(SNAPSHOT_KEY)
+
+
+def snapshot():
+    """The front entries of the leaderboard, or None while none is available.
+
+    A stale snapshot is refreshed by whichever worker takes the lock first,
+    while the others keep serving it, so expiry never sends every request to
+    the users table at once.
+    """
+    cached = cache.get(SNAPSHOT_KEY)
+    if cached and cached["refresh_at"] > time.time():
+        return cached["entries"]
+    if cache.add(SNAPSHOT_LOCK_KEY, True, SNAPSHOT_TIMEOUT):
+        try:
+            return refresh_snapshot()
+        finally:
+            cache.delete(SNAPSHOT_LOCK_KEY)
+    return cached["entries"] if cached else None
+
+
+def page(after=None):
+    entries = snapshot()
+    start = after["index"] + 1 if after else 0
+    if entries is not None and (
+        not after
+        or (
+            after["index"] < len(entries)
+            and entries[after["index"]]["id"] == after["id"]
+        )
+    ):
+        results = entries[start : start + LEADERBOARD_PAGE_SIZE]
+        if len(results) == LEADERBOARD_PAGE_SIZE or len(entries) < SNAPSHOT_SIZE:
+            return results
+    return list(with_ranks(ranked_users(after)[:LEADERBOARD_PAGE_SIZE], after))
@@ -0,0 +1,38 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api import points
+
+
+class Command(BaseCommand):
+    help = "Folds old points ledger entries into one entry per user"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=30,
+            help="Compact entries older than this many days",
+        )
+        parser.add_argument(
+            "--verify",
+            action="store_true",
+            help="Report users whose points differ from their ledger total",
+        )
+
+    def handle(self, *args, **options):
+        before = timezone.now() - datetime.timedelta(days=options["days"])
+        compacted = points.compact(before)
+        self.stdout.write(
+            self.style.SUCCESS(f"Compacted {compacted} points ledger entries")
+        )
+        if options["verify"]:
+            for username, balance, ledger_total in points.mismatched_balances():
+                self.stdout.write(
+                    self.style.WARNING(
+                        f"{username} has {balance} points but a ledger total "
+                        f"of {ledger_total}"
+                    )
+                )
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api import accounts
+from api.models import User
+
+
+class Command(BaseCommand):
+    help = "Deletes the accounts users have asked to delete, a chunk at a time"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=accounts.DELETION_CHUNK_SIZE,
+            help="Rows to delete per transaction",
+        )
+
+    def handle(self, *args, **options):
+        users = User.objects.filter(deletion_requested_at__isnull=False).order_by(
+            "deletion_requested_at"
+        )
+        failed = []
+        for user in users:
+            self.stdout.write(f"Deleting {user.username}")
+            try:
+                accounts.delete_account(
+                    user,
+                    options["chunk_size"],
+                    lambda step, count: self.stdout.write(f"  Deleted {count} {step}"),
+                )
+            except Exception as exc:
+                # Left for the next run, without holding up the users after it.
+                self.stderr.write(f"Could not delete {user.username}: {exc}")
+                failed.append(user.username)
+                continue
+            self.stdout.write(self.style.SUCCESS(f"Deleted {user.username}"))
+        if failed:
+            raise CommandError(f"Could not delete {len(failed)} accounts")
@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api import webhooks
+
+
+class Command(BaseCommand):
+    help = "Ingests queued Cloudflare webhook events in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=webhooks.INGEST_BATCH_SIZE,
+            help="Events to ingest per transaction",
+        )
+        parser.add_argument(
+            "--forever",
+            action="store_true",
+            help="Keep waiting for new events once the queue is empty",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=1,
+            help="Seconds to wait between polls of an empty queue",
+        )
+
+    def handle(self, *args, **options):
+        ingested = 0
+        while True:
+            drained = webhooks.drain(options["batch_size"])
+            ingested += drained
+            if drained < options["batch_size"]:
+                if not options["forever"]:
+                    break
+                time.sleep(options["sleep"])
+        self.stdout.write(self.style.SUCCESS(f"Ingested {ingested} webhook events"))
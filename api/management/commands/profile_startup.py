@@ -0,0 +1,83 @@
+import subprocess
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+# Boots the app as a worker does: settings, app registry and URL conf.
+# -X importtime only times import statements, so importlib.import_module,
+# which Django loads apps, models and settings classes with, is routed
+# through one.
+BOOT = """
+import importlib._bootstrap
+import sys
+
+gcd_import = importlib._bootstrap._gcd_import
+
+
+def timed_gcd_import(name, package=None, level=0):
+    if level:
+        return gcd_import(name, package, level)
+    __import__(name)
+    return sys.modules[name]
+
+
+importlib._bootstrap._gcd_import = timed_gcd_import
+
+import django
+
+django.setup()
+import server.urls
+"""
+PACKAGES = ("api", "server")
+
+
+class Command(BaseCommand):
+    help = "Reports how long each module under api/ and server/ takes to import"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--budget",
+            type=float,
+            help="Fail if booting takes longer than this many milliseconds",
+        )
+        parser.add_argument(
+            "--top",
+            type=int,
+            default=20,
+            help="Number of modules to report",
+        )
+
+    def handle(self, *args, **options):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", BOOT],
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode:
+            raise CommandError(result.stderr)
+        modules = []
+        total = 0
+        for line in result.stderr.splitlines():
+            if not line.startswith("import time:"):
+                continue
+            self_us, cumulative_us, name = line.removeprefix("import time:").split("|")
+            if not self_us.strip().isdigit():
+                continue
+            module = name.strip()
+            # Nested imports are indented, so only top level imports add up.
+            if name.startswith(" " + module):
+                total += int(cumulative_us)
+            if module.split(".")[0] in PACKAGES:
+                modules.append((int(cumulative_us), int(self_us), module))
+        modules.sort(reverse=True)
+        self.stdout.write(f"{'cumulative ms':>14} {'self ms':>8}  module")
+        for cumulative_us, self_us, name in modules[: options["top"]]:
+            self.stdout.write(
+                f"{cumulative_us / 1000:>14.1f} {self_us / 1000:>8.1f}  {name}"
+            )
+        total_ms = total / 1000
+        self.stdout.write(f"Booting imports took {total_ms:.1f} ms")
+        if options["budget"] is not None and total_ms > options["budget"]:
+            raise CommandError(
+                f"Boot took {total_ms:.1f} ms, over the {options['budget']:.1f} ms budget"
+            )
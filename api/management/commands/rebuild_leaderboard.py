@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from api import leaderboard
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the points histogram used for ranking from user points"
+
+    def handle(self, *args, **options):
+        buckets = leaderboard.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {buckets} points buckets"))
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+
+from api import cloudflare, reconcile
+
+
+class Command(BaseCommand):
+    help = "Backfills videos missing from Cloudflare webhooks and queues orphans"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--page-size",
+            type=int,
+            default=cloudflare.LIST_PAGE_SIZE,
+            help="Videos to fetch from Cloudflare and diff at a time",
+        )
+        parser.add_argument(
+            "--delete-orphans",
+            action="store_true",
+            help="Delete queued orphans from Cloudflare afterwards",
+        )
+
+    def handle(self, *args, **options):
+        listed = ingested = orphaned = 0
+        for page in cloudflare.client.video_pages(options["page_size"]):
+            page_ingested, page_orphaned = reconcile.reconcile(page)
+            listed += len(page)
+            ingested += page_ingested
+            orphaned += page_orphaned
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Listed {listed} videos, ingested {ingested} and queued "
+                f"{orphaned} orphans for deletion"
+            )
+        )
+        if options["delete_orphans"]:
+            deleted = reconcile.delete_orphans()
+            self.stdout.write(
+                self.style.SUCCESS(f"Deleted {deleted} orphans from Cloudflare")
+            )
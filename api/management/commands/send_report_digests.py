@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from api import reports
+
+
+class Command(BaseCommand):
+    help = "Emails moderators the videos reported since the last digest"
+
+    def handle(self, *args, **options):
+        sent = reports.send_digests()
+        self.stdout.write(self.style.SUCCESS(f"Sent {sent} report emails"))
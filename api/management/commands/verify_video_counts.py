@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+
+from api import interactions, neighbourhood
+
+# Each check finds the videos whose counted columns differ from a fresh count,
+# annotated as actual_<column>, and recounts them.
+CHECKS = [
+    (
+        list(interactions.COUNTERS.values()),
+        interactions.mismatched_counts,
+        interactions.recount,
+    ),
+    (["creators_nearby"], neighbourhood.mismatched_counts, neighbourhood.recount),
+]
+
+
+class Command(BaseCommand):
+    help = "Reports videos whose interaction or neighbourhood counts are wrong"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--fix",
+            action="store_true",
+            help="Recount the mismatched videos",
+        )
+
+    def handle(self, *args, **options):
+        for columns, mismatched_counts, recount in CHECKS:
+            mismatched = list(mismatched_counts())
+            for video in mismatched:
+                counts = ", ".join(
+                    f"{getattr(video, column)} {column} but "
+                    f"{getattr(video, f'actual_{column}')} counted"
+                    for column in columns
+                    if getattr(video, column) != getattr(video, f"actual_{column}")
+                )
+                self.stdout.write(self.style.WARNING(f"Video {video.id} has {counts}"))
+            if options["fix"]:
+                recount(mismatched)
+                self.stdout.write(
+                    self.style.SUCCESS(
+                        f"Recounted {', '.join(columns)} of {len(mismatched)} videos"
+                    )
+                )
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.13 on 2026-10-18 11:37
+
+import django.contrib.gis.db.models.fields
+import django.contrib.postgres.indexes
+from django.db import migrations
+import django.db.models.functions.comparison
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0028_video_starring"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="video",
+            index=django.contrib.postgres.indexes.GistIndex(
+                django.db.models.functions.comparison.Cast(
+                    "location",
+                    output_field=django.contrib.gis.db.models.fields.PointField(
+                        geography=True, srid=4326
+                    ),
+                ),
+                name="video_location_geography",
+            ),
+        ),
+    ]
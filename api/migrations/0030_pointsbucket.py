@@ -0,0 +1,37 @@
+# Generated by Django 4.2.13 on 2026-10-18 11:42
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_buckets(apps, schema_editor):
+    User = apps.get_model("api", "User")
+    PointsBucket = apps.get_model("api", "PointsBucket")
+    PointsBucket.objects.bulk_create(
+        PointsBucket(points=bucket["points"], users=bucket["users"])
+        for bucket in User.objects.filter(points__gt=0)
+        .order_by()
+        .values("points")
+        .annotate(users=Count("id"))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0029_video_location_geography"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PointsBucket",
+            fields=[
+                (
+                    "points",
+                    models.PositiveBigIntegerField(primary_key=True, serialize=False),
+                ),
+                ("users", models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(fill_buckets, reverse_code=migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.13 on 2026-10-18 11:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0030_pointsbucket"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="user",
+            index=models.Index(fields=["-points", "id"], name="user_leaderboard"),
+        ),
+    ]
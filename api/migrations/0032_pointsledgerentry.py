@@ -0,0 +1,80 @@
+# Generated by Django 4.2.13 on 2026-10-18 11:43
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def open_balances(apps, schema_editor):
+    User = apps.get_model("api", "User")
+    PointsLedgerEntry = apps.get_model("api", "PointsLedgerEntry")
+    PointsLedgerEntry.objects.bulk_create(
+        (
+            PointsLedgerEntry(user_id=user_id, points=points, reason="opening_balance")
+            for user_id, points in User.objects.filter(points__gt=0)
+            .values_list("id", "points")
+            .iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0031_user_leaderboard"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PointsLedgerEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("points", models.BigIntegerField()),
+                (
+                    "reason",
+                    models.CharField(
+                        choices=[
+                            ("opening_balance", "Opening Balance"),
+                            ("first_video_around", "First Video Around"),
+                            ("directions_requested", "Directions Requested"),
+                            ("compacted", "Compacted"),
+                        ],
+                        max_length=32,
+                    ),
+                ),
+                ("awarded_at", models.DateTimeField(default=django.utils.timezone.now)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="points_ledger",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "video",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        to="api.video",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(fields=["awarded_at"], name="points_ledger_awarded_at")
+                ],
+            },
+        ),
+        migrations.RunPython(open_balances, reverse_code=migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.13 on 2026-10-18 11:44
+
+from django.db import migrations, models
+
+COUNT_CREATORS_NEARBY = """
+    UPDATE api_video AS video SET creators_nearby = (
+        SELECT COUNT(DISTINCT other.creator_id)
+        FROM api_video AS other
+        WHERE other.creator_id <> video.creator_id
+        AND ST_DWithin(
+            other.location::geography(POINT,4326),
+            video.location::geography(POINT,4326),
+            1609.344,
+            false
+        )
+    )
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0032_pointsledgerentry"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="video",
+            name="creators_nearby",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunSQL(COUNT_CREATORS_NEARBY, reverse_sql=migrations.RunSQL.noop),
+    ]
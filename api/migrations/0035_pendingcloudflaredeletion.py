@@ -0,0 +1,30 @@
+# Generated by Django 4.2.13 on 2026-10-18 11:54
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0034_webhookevent"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PendingCloudflareDeletion",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("cloudflare_uid", models.CharField(max_length=255, unique=True)),
+                ("queued_at", models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.13 on 2026-10-18 11:58
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0035_pendingcloudflaredeletion"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ReportNotification",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "reported_at",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                (
+                    "video",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, to="api.video"
+                    ),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.13 on 2026-10-18 12:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0036_reportnotification"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="deletion_requested_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,117 @@
+# Generated by Django 4.2.13 on 2026-10-18 12:03
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+# The rows of the per-kind many-to-many tables being merged, copied across
+# before the new table is indexed.
+INTERACTION_TABLES = [
+    ("api_video_reported_by", "reported"),
+    ("api_video_hidden_from", "hidden"),
+    ("api_video_directions_requested_by", "directions_requested"),
+]
+COPY_INTERACTIONS = [
+    f"INSERT INTO api_videointeraction (user_id, video_id, kind) "
+    f"SELECT user_id, video_id, '{kind}' FROM {table}"
+    for table, kind in INTERACTION_TABLES
+]
+COPY_INTERACTIONS_BACK = [
+    f"INSERT INTO {table} (user_id, video_id) "
+    f"SELECT user_id, video_id FROM api_videointeraction WHERE kind = '{kind}'"
+    for table, kind in INTERACTION_TABLES
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0037_user_deletion_requested_at"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="VideoInteraction",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("reported", "Reported"),
+                            ("hidden", "Hidden"),
+                            ("directions_requested", "Directions Requested"),
+                        ],
+                        max_length=32,
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="video_interactions",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "video",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="interactions",
+                        to="api.video",
+                    ),
+                ),
+            ],
+        ),
+        migrations.RunSQL(COPY_INTERACTIONS, COPY_INTERACTIONS_BACK),
+        migrations.AddConstraint(
+            model_name="videointeraction",
+            constraint=models.UniqueConstraint(
+                fields=("user", "video", "kind"), name="video_interaction_unique"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="videointeraction",
+            index=models.Index(
+                fields=["video", "kind"], name="video_interaction_video"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="videointeraction",
+            index=models.Index(
+                condition=models.Q(("kind__in", ["reported", "hidden"])),
+                fields=["user", "video"],
+                name="video_interaction_excluded",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="videointeraction",
+            index=models.Index(
+                condition=models.Q(("kind", "reported")),
+                fields=["video"],
+                name="video_interaction_reported",
+            ),
+        ),
+        migrations.RemoveField(
+            model_name="video",
+            name="directions_requested_by",
+        ),
+        migrations.RemoveField(
+            model_name="video",
+            name="hidden_from",
+        ),
+        migrations.RemoveField(
+            model_name="video",
+            name="reported_by",
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 4.2.13 on 2026-10-18 12:05
+
+from django.db import migrations, models
+
+BACKFILL_COUNTS = """
+    UPDATE api_video SET
+        report_count = counts.report_count,
+        hide_count = counts.hide_count,
+        directions_request_count = counts.directions_request_count
+    FROM (
+        SELECT
+            video_id,
+            count(*) FILTER (WHERE kind = 'reported') AS report_count,
+            count(*) FILTER (WHERE kind = 'hidden') AS hide_count,
+            count(*) FILTER (WHERE kind = 'directions_requested')
+                AS directions_request_count
+        FROM api_videointeraction
+        GROUP BY video_id
+    ) AS counts
+    WHERE api_video.id = counts.video_id
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0038_videointeraction"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="videointeraction",
+            name="video_interaction_reported",
+        ),
+        migrations.AddField(
+            model_name="video",
+            name="directions_request_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="video",
+            name="hide_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="video",
+            name="report_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunSQL(BACKFILL_COUNTS, migrations.RunSQL.noop),
+        migrations.AddIndex(
+            model_name="video",
+            index=models.Index(
+                condition=models.Q(("report_count__gt", 0)),
+                fields=["-report_count"],
+                name="video_reported",
+            ),
+        ),
+    ]
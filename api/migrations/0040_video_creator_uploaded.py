@@ -0,0 +1,30 @@
+# Generated by Django 4.2.13 on 2026-10-18 12:07
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0039_video_interaction_counts"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="video",
+            index=models.Index(
+                fields=["creator", "-uploaded_at", "-id"], name="video_creator_uploaded"
+            ),
+        ),
+        migrations.AlterField(
+            model_name="video",
+            name="creator",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.13 on 2026-10-18 12:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0040_video_creator_uploaded"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="webhookevent",
+            name="attempts",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="webhookevent",
+            name="error",
+            field=models.TextField(blank=True),
+        ),
+    ]
@@ -3,11 +3,13 @@ import uuid
 
 from django.contrib.auth.models import AbstractUser
 from django.contrib.gis.db import models
+from django.contrib.postgres.indexes import GistIndex
+from django.db.models.functions import Cast
+from django.utils import timezone
 from moneyed import list_all_currencies
 
-CURRENCY_CHOICES = [
-    (str(currency), str(currency)) for currency in list_all_currencies()
-]
+CURRENCY_CODES = [str(currency) for currency in list_all_currencies()]
+CURRENCY_CHOICES = [(code, code) for code in CURRENCY_CODES]
 
 
 class User(AbstractUser):
@@ -16,6 +18,34 @@ class User(AbstractUser):
     points = models.PositiveBigIntegerField(default=0)
     display_name = models.CharField(max_length=28, null=True, blank=True, unique=True)
     buddies = models.ManyToManyField("self", blank=True)
+    # Set when the user asks to delete their account, until delete_accounts
+    # has removed it.
+    deletion_requested_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta(AbstractUser.Meta):
+        indexes = [models.Index(fields=["-points", "id"], name="user_leaderboard")]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        user = super().from_db(db, field_names, values)
+        # Points as last saved, so the leaderboard can move the user on save.
+        user.saved_points = user.__dict__.get("points")
+        return user
+
+    def refresh_from_db(self, using=None, fields=None):
+        # Users from authentication only have their id and username, so the
+        # first deferred field read loads the rest of the row with it.
+        deferred_fields = self.get_deferred_fields()
+        if fields is not None and deferred_fields.issuperset(fields):
+            fields = deferred_fields
+        super().refresh_from_db(using, fields)
+        if fields is None or "points" in fields:
+            self.saved_points = self.__dict__.get("points")
+
+
+class PointsBucket(models.Model):
+    points = models.PositiveBigIntegerField(primary_key=True)
+    users = models.IntegerField(default=0)
 
 
 class BuddyRequest(models.Model):
@@ -31,7 +61,8 @@ class BuddyRequest(models.Model):
 class Video(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     uploaded_at = models.DateTimeField()
-    creator = models.ForeignKey(User, on_delete=models.CASCADE)
+    # Indexed by video_creator_uploaded.
+    creator = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False)
     starring = models.ForeignKey(
         User, on_delete=models.CASCADE, related_name="videos_starring"
     )
@@ -40,22 +71,137 @@ class Video(models.Model):
     hls = models.URLField()
     preview = models.URLField()
     cloudflare_uid = models.CharField(max_length=255, default=uuid.uuid4, unique=True)
-    reported_by = models.ManyToManyField(User, related_name="reported_videos")
-    hidden_from = models.ManyToManyField(User, related_name="hidden_videos")
-    directions_requested_by = models.ManyToManyField(
-        User, related_name="directions_requested_videos"
-    )
     currency = models.CharField(max_length=3, choices=CURRENCY_CHOICES, default="GBP")
     money_spent = models.DecimalField(
         max_digits=14, decimal_places=2, default=decimal.Decimal("0.00")
     )
+    # Distinct other creators with a video within a mile of this one.
+    creators_nearby = models.PositiveIntegerField(default=0)
+    # Interactions with this video, kept in step with VideoInteraction rows
+    # by api.interactions.
+    report_count = models.PositiveIntegerField(default=0)
+    hide_count = models.PositiveIntegerField(default=0)
+    directions_request_count = models.PositiveIntegerField(default=0)
 
     class Meta:
         constraints = [
             models.CheckConstraint(
                 name="currency_valid",
-                check=models.Q(
-                    currency__in=[str(currency) for currency in list_all_currencies()]
-                ),
+                check=models.Q(currency__in=CURRENCY_CODES),
+            )
+        ]
+        indexes = [
+            GistIndex(
+                Cast("location", output_field=models.PointField(geography=True)),
+                name="video_location_geography",
+            ),
+            models.Index(
+                fields=["creator", "-uploaded_at", "-id"],
+                name="video_creator_uploaded",
+            ),
+            # Videos awaiting moderation, most reported first.
+            models.Index(
+                fields=["-report_count"],
+                condition=models.Q(report_count__gt=0),
+                name="video_reported",
+            ),
+        ]
+
+    def interacted(self, kind):
+        return User.objects.filter(
+            video_interactions__video=self, video_interactions__kind=kind
+        )
+
+    @property
+    def reported_by(self):
+        return self.interacted(VideoInteraction.Kind.REPORTED)
+
+    @property
+    def hidden_from(self):
+        return self.interacted(VideoInteraction.Kind.HIDDEN)
+
+    @property
+    def directions_requested_by(self):
+        return self.interacted(VideoInteraction.Kind.DIRECTIONS_REQUESTED)
+
+
+class VideoInteraction(models.Model):
+    """A user reporting, hiding or requesting directions to a video."""
+
+    class Kind(models.TextChoices):
+        REPORTED = "reported"
+        HIDDEN = "hidden"
+        DIRECTIONS_REQUESTED = "directions_requested"
+
+    # The indexes below lead with both foreign keys, so neither needs its own.
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="video_interactions",
+        db_index=False,
+    )
+    video = models.ForeignKey(
+        Video, on_delete=models.CASCADE, related_name="interactions", db_index=False
+    )
+    kind = models.CharField(max_length=32, choices=Kind.choices)
+
+    class Meta:
+        constraints = [
+            # Also serves checking whether a user already interacted with a
+            # video.
+            models.UniqueConstraint(
+                fields=["user", "video", "kind"], name="video_interaction_unique"
             )
         ]
+        indexes = [
+            models.Index(fields=["video", "kind"], name="video_interaction_video"),
+            # Videos excluded from a user's feed.
+            models.Index(
+                fields=["user", "video"],
+                condition=models.Q(kind__in=["reported", "hidden"]),
+                name="video_interaction_excluded",
+            ),
+        ]
+
+
+class PointsLedgerEntry(models.Model):
+    class Reason(models.TextChoices):
+        OPENING_BALANCE = "opening_balance"
+        FIRST_VIDEO_AROUND = "first_video_around"
+        DIRECTIONS_REQUESTED = "directions_requested"
+        COMPACTED = "compacted"
+
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="points_ledger"
+    )
+    points = models.BigIntegerField()
+    reason = models.CharField(max_length=32, choices=Reason.choices)
+    video = models.ForeignKey(Video, on_delete=models.SET_NULL, null=True)
+    awarded_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [models.Index(fields=["awarded_at"], name="points_ledger_awarded_at")]
+
+
+class WebhookEvent(models.Model):
+    """A Cloudflare Stream webhook event waiting to be ingested."""
+
+    uid = models.CharField(max_length=255, unique=True)
+    payload = models.JSONField()
+    received_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+
+
+class PendingCloudflareDeletion(models.Model):
+    """A Cloudflare Stream video with no Video row, waiting to be deleted."""
+
+    cloudflare_uid = models.CharField(max_length=255, unique=True)
+    queued_at = models.DateTimeField(default=timezone.now)
+
+
+class ReportNotification(models.Model):
+    """A video report waiting to go out in the next moderation digest."""
+
+    video = models.ForeignKey(Video, on_delete=models.CASCADE)
+    reported_at = models.DateTimeField(default=timezone.now)
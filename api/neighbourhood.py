@@ -0,0 +1,121 @@
+from django.contrib.gis.measure import D
+from django.db import connection, transaction
+
+from api.models import Video
+
+NEIGHBOURHOOD_METRES = D(mi=1).m
+
+# These statements look a video's neighbours up by sphere distance through the
+# location geography index, matching the distance_lte=D(mi=1) lookups.
+CREATORS_NEARBY = f"""(
+    SELECT COUNT(DISTINCT other.creator_id)
+    FROM {Video._meta.db_table} AS other
+    WHERE other.creator_id <> video.creator_id
+    AND ST_DWithin(
+        other.location::geography(POINT,4326),
+        video.location::geography(POINT,4326),
+        %(metres)s,
+        false
+    )
+)"""
+# Recounting every video in range of a batch of new videos keeps the counts
+# exact however the new videos overlap each other.
+RECOUNT_AROUND = f"""
+    UPDATE {Video._meta.db_table} AS video SET creators_nearby = {CREATORS_NEARBY}
+    WHERE EXISTS (
+        SELECT 1 FROM {Video._meta.db_table} AS joined
+        WHERE joined.id = ANY(%(videos)s::uuid[])
+        AND ST_DWithin(
+            joined.location::geography(POINT,4326),
+            video.location::geography(POINT,4326),
+            %(metres)s,
+            false
+        )
+    )
+"""
+RECOUNT = f"""
+    UPDATE {Video._meta.db_table} AS video SET creators_nearby = {CREATORS_NEARBY}
+    WHERE video.id = ANY(%(videos)s::uuid[])
+"""
+MISMATCHED = f"""
+    SELECT * FROM (
+        SELECT video.id, video.creators_nearby,
+        {CREATORS_NEARBY} AS actual_creators_nearby
+        FROM {Video._meta.db_table} AS video
+    ) AS counted
+    WHERE creators_nearby <> actual_creators_nearby
+"""
+# Neighbours only gain or lose a creator when the video is that creator's
+# only one within range of them.
+SHIFT_NEIGHBOURS = f"""
+    UPDATE {Video._meta.db_table} AS video
+    SET creators_nearby = video.creators_nearby + %(shift)s
+    FROM {Video._meta.db_table} AS moved
+    WHERE moved.id = %(video)s
+    AND video.id <> moved.id
+    AND video.creator_id <> moved.creator_id
+    AND ST_DWithin(
+        video.location::geography(POINT,4326),
+        moved.location::geography(POINT,4326),
+        %(metres)s,
+        false
+    )
+    AND NOT EXISTS (
+        SELECT 1 FROM {Video._meta.db_table} AS other
+        WHERE other.creator_id = moved.creator_id
+        AND other.id <> moved.id
+        AND ST_DWithin(
+            other.location::geography(POINT,4326),
+            video.location::geography(POINT,4326),
+            %(metres)s,
+            false
+        )
+    )
+"""
+
+
+def join_neighbourhoods(videos):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            RECOUNT_AROUND,
+            {
+                "videos": [str(video.id) for video in videos],
+                "metres": NEIGHBOURHOOD_METRES,
+            },
+        )
+
+
+def leave_neighbourhood(video):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            SHIFT_NEIGHBOURS,
+            {"video": video.id, "metres": NEIGHBOURHOOD_METRES, "shift": -1},
+        )
+
+
+def leave_and_delete(videos):
+    """Deletes the videos one at a time, each leaving its neighbourhood first."""
+    with transaction.atomic():
+        for video in videos:
+            leave_neighbourhood(video)
+            video.delete()
+
+
+def mismatched_counts():
+    """Videos whose creators_nearby differs from a count of their neighbours.
+
+    Each comes with its actual count, as actual_creators_nearby.
+    """
+    return Video.objects.raw(MISMATCHED, {"metres": NEIGHBOURHOOD_METRES})
+
+
+def recount(videos):
+    """Sets creators_nearby of the videos from their current neighbours."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            RECOUNT,
+            {
+                "videos": [str(video.id) for video in videos],
+                "metres": NEIGHBOURHOOD_METRES,
+            },
+        )
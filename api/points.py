@@ -0,0 +1,105 @@
+from collections import Counter
+
+from django.db import connection, transaction
+from django.db.models import F, Func, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from api import leaderboard
+from api.models import PointsLedgerEntry, User
+
+
+def award(users, points, reason, video=None):
+    new_points = award_many([(users, points, video)], reason)
+    for user in users:
+        user.points = user.saved_points = new_points[user.pk]
+
+
+def award_many(awards, reason):
+    """Awards (users, points, video) triples with one statement per table.
+
+    Each distinct user of an award is awarded once, even when they appear
+    twice. Returns each awarded user's id mapped to their new points.
+    """
+    entries = []
+    totals = Counter()
+    for users, points, video in awards:
+        for user_id in {user.pk for user in users}:
+            entries.append(
+                PointsLedgerEntry(
+                    user_id=user_id, points=points, reason=reason, video=video
+                )
+            )
+            totals[user_id] += points
+    if not entries:
+        return {}
+    # Rows are locked in id order, so concurrent awards cannot deadlock.
+    user_ids = sorted(totals)
+    with transaction.atomic():
+        PointsLedgerEntry.objects.bulk_create(entries)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                UPDATE {User._meta.db_table} AS awarded_user
+                SET points = awarded_user.points + awarded.points
+                FROM (
+                    SELECT id FROM {User._meta.db_table}
+                    WHERE id = ANY(%(ids)s) ORDER BY id FOR UPDATE
+                ) AS locked,
+                unnest(%(ids)s::bigint[], %(points)s::bigint[]) AS awarded (id, points)
+                WHERE awarded_user.id = locked.id AND locked.id = awarded.id
+                RETURNING awarded_user.id, awarded_user.points, awarded_user.is_active
+                """,
+                {"ids": user_ids, "points": [totals[user_id] for user_id in user_ids]},
+            )
+            awarded = cursor.fetchall()
+        # Users awaiting deletion have already left the leaderboard.
+        leaderboard.move_many(
+            (points - totals[user_id], points)
+            for user_id, points, is_active in awarded
+            if is_active
+        )
+    return {user_id: points for user_id, points, _ in awarded}
+
+
+def compact(before, batch_size=1000):
+    """Folds ledger entries older than `before` into one entry per user."""
+    compacted = 0
+    old_entries = PointsLedgerEntry.objects.filter(awarded_at__lt=before)
+    while True:
+        with transaction.atomic():
+            user_ids = list(
+                old_entries.exclude(reason=PointsLedgerEntry.Reason.COMPACTED)
+                .order_by("user_id")
+                .values_list("user_id", flat=True)
+                .distinct()[:batch_size]
+            )
+            if not user_ids:
+                return compacted
+            entries = old_entries.filter(user_id__in=user_ids)
+            totals = list(
+                entries.order_by().values("user_id").annotate(points=Sum("points"))
+            )
+            compacted += entries.delete()[0]
+            PointsLedgerEntry.objects.bulk_create(
+                PointsLedgerEntry(
+                    user_id=total["user_id"],
+                    points=total["points"],
+                    reason=PointsLedgerEntry.Reason.COMPACTED,
+                    awarded_at=before,
+                )
+                for total in totals
+            )
+
+
+def mismatched_balances():
+    ledger_points = (
+        PointsLedgerEntry.objects.filter(user=OuterRef("pk"))
+        .order_by()
+        .annotate(total=Func(F("points"), function="SUM"))
+        .values("total")
+    )
+    return (
+        User.objects.annotate(ledger_points=Coalesce(Subquery(ledger_points), Value(0)))
+        .exclude(points=F("ledger_points"))
+        .values_list("username", "points", "ledger_points")
+    )
@@ -0,0 +1,51 @@
+import uuid
+
+from django.core.cache import cache, caches
+from django.db import DEFAULT_DB_ALIAS
+
+from api.models import User
+
+# Ids are cached per worker under the current principal generation. Forgetting
+# a principal bumps the generation in the shared cache, which other workers
+# read at most every GENERATION_TIMEOUT seconds.
+GENERATION_KEY = "principal-generation"
+GENERATION_TIMEOUT = 5
+
+
+def generation():
+    local = caches["principals"]
+    current = local.get(GENERATION_KEY)
+    if current is None:
+        current = cache.get_or_set(GENERATION_KEY, uuid.uuid4().hex, None)
+        local.set(GENERATION_KEY, current, GENERATION_TIMEOUT)
+    return current
+
+
+def principal_key(uid):
+    return f"principal-{generation()}-{uid}"
+
+
+def forget_principal(uid):
+    cache.set(GENERATION_KEY, uuid.uuid4().hex, None)
+    caches["principals"].delete(GENERATION_KEY)
+
+
+def principal(uid):
+    """The user for a Firebase uid, with only its id and username loaded.
+
+    None if the user has been deactivated, as when their account is being
+    deleted.
+    """
+    key = principal_key(uid)
+    user_id = caches["principals"].get(key)
+    if user_id is None:
+        users = User.objects.filter(username=uid).values_list("id", "is_active")
+        user = users.first()
+        if user is None:
+            User.objects.bulk_create([User(username=uid)], ignore_conflicts=True)
+            user = users.get()
+        user_id, is_active = user
+        if not is_active:
+            return None
+        caches["principals"].set(key, user_id)
+    return User.from_db(DEFAULT_DB_ALIAS, ["id", "username"], [user_id, uid])
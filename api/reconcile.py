@@ -0,0 +1,74 @@
+import logging
+
+from api import cloudflare, webhooks
+from api.models import PendingCloudflareDeletion, User, Video
+from api.webhook_payloads import WebhookPayloadSerializer
+
+logger = logging.getLogger(__name__)
+
+ORPHANS_PER_BATCH = 1000
+
+
+def reconcile(videos):
+    """Diffs a page of Stream videos against the Video table.
+
+    Ready videos that are missing from it are ingested. Videos whose creator
+    or starring user no longer exists are queued for deletion. Returns the
+    number of videos ingested and queued.
+    """
+    uids = [video["uid"] for video in videos]
+    known = set(
+        Video.objects.filter(cloudflare_uid__in=uids).values_list(
+            "cloudflare_uid", flat=True
+        )
+    )
+    unknown = [video for video in videos if video["uid"] not in known]
+    owners = [
+        (
+            (video.get("meta") or {}).get("firebase_uid"),
+            (video.get("meta") or {}).get("starring_firebase_uid"),
+        )
+        for video in unknown
+    ]
+    users = set(
+        User.objects.filter(
+            username__in={username for pair in owners for username in pair}
+        ).values_list("username", flat=True)
+    )
+    events, orphans = [], []
+    for video, (creator, starring) in zip(unknown, owners):
+        if not creator or not starring:
+            # Not uploaded through the app, so left alone.
+            continue
+        if creator not in users or starring not in users:
+            orphans.append(PendingCloudflareDeletion(cloudflare_uid=video["uid"]))
+            continue
+        serializer = WebhookPayloadSerializer(data=video)
+        if serializer.is_valid():
+            events.append(serializer.validated_data)
+    ingested = webhooks.ingest(events)
+    PendingCloudflareDeletion.objects.bulk_create(orphans, ignore_conflicts=True)
+    return len(ingested), len(orphans)
+
+
+def delete_orphans():
+    """Deletes queued orphans from Cloudflare, returning how many were deleted."""
+    deleted, last_id = 0, 0
+    while True:
+        batch = list(
+            PendingCloudflareDeletion.objects.filter(id__gt=last_id)
+            .order_by("id")
+            .values_list("id", "cloudflare_uid")[:ORPHANS_PER_BATCH]
+        )
+        if not batch:
+            return deleted
+        last_id = batch[-1][0]
+        errors = cloudflare.delete_videos([uid for _, uid in batch])
+        removed = []
+        for uid, error in errors.items():
+            if error:
+                logger.warning("Could not delete orphan %s: %s", uid, error)
+            else:
+                removed.append(uid)
+        PendingCloudflareDeletion.objects.filter(cloudflare_uid__in=removed).delete()
+        deleted += len(removed)
@@ -0,0 +1,48 @@
+import os
+from collections import Counter
+
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import connection, transaction
+from django.template.loader import render_to_string
+from django.utils.html import strip_tags
+
+from api import interactions
+from api.models import ReportNotification, VideoInteraction
+
+
+def report(video, user):
+    # The report's notification is queued in the same statement. Repeat
+    # reports by the same user are ignored and not notified again.
+    interactions.record(user, video, VideoInteraction.Kind.REPORTED)
+
+
+def send_digests():
+    """Emails moderators once per reported video, returning the emails sent."""
+    with transaction.atomic():
+        pending = list(
+            ReportNotification.objects.select_for_update(skip_locked=True)
+            .order_by("reported_at")
+            .values_list("id", "video_id")
+        )
+        reports = Counter(video_id for _, video_id in pending)
+        messages = []
+        for video_id, count in reports.items():
+            html_message = render_to_string(
+                "reported_video.html",
+                context={"reported_video_id": str(video_id), "reports": count},
+            )
+            message = EmailMultiAlternatives(
+                subject="Video reported",
+                from_email=f"FlitFlok <{os.environ.get('EMAIL_HOST_USER')}>",
+                body=strip_tags(html_message),
+                to=[os.environ.get("EMAIL_HOST_USER")],
+            )
+            message.attach_alternative(html_message, "text/html")
+            messages.append(message)
+        if messages:
+            # One SMTP session for the whole digest.
+            get_connection(fail_silently=False).send_messages(messages)
+        ReportNotification.objects.filter(
+            id__in=[notification_id for notification_id, _ in pending]
+        ).delete()
+    return len(messages)
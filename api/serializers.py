@@ -1,19 +1,25 @@
 import base64
 import datetime
-import decimal
-import os
 
 import requests
-from django.contrib.gis.geos import Point
-from django.contrib.gis.measure import D
-from django.core.mail import EmailMultiAlternatives
-from django.template.loader import render_to_string
-from django.utils.html import strip_tags
-from firebase_admin import auth
+from django.core import signing
 from rest_framework import serializers
 from rest_framework_gis.serializers import GeoFeatureModelSerializer
 
-from api.models import User, Video, CURRENCY_CHOICES, BuddyRequest
+from api import cloudflare, firebase, interactions, leaderboard, reports, webhooks
+from api.exceptions import CloudflareUnavailable
+from api.feed import (
+    CREATOR_PAGE_MAX,
+    decode_creator_cursor,
+    decode_cursor,
+    forget_exclusions,
+)
+from api.models import (
+    User,
+    Video,
+    BuddyRequest,
+)
+from api.webhook_payloads import WebhookPayloadSerializer
 
 
 class BlockBuddyRequestSerializer(serializers.Serializer):
@@ -23,6 +29,7 @@ class BlockBuddyRequestSerializer(serializers.Serializer):
         sender = buddy_request.sender
         receiver = buddy_request.receiver
         receiver.blocked_users.add(sender)
+        forget_exclusions(receiver, sender)
         buddy_request.delete()
         return {}
 
@@ -87,68 +94,16 @@ class PlaybackIdSerializer(serializers.Serializer):
     id = serializers.CharField()
 
 
-class PlaybackSerializer(serializers.Serializer):
-    hls = serializers.URLField()
-
-
-class MetaSerializer(serializers.Serializer):
-    firebase_uid = serializers.CharField()
-    starring_firebase_uid = serializers.CharField()
-    latitude = serializers.CharField()
-    longitude = serializers.CharField()
-    currency = serializers.ChoiceField(choices=CURRENCY_CHOICES)
-    money_spent = serializers.DecimalField(
-        max_digits=14, decimal_places=2, min_value=decimal.Decimal("0.00")
-    )
+class WebhookEventSerializer(WebhookPayloadSerializer):
+    def save(self):
+        webhooks.ingest([self.validated_data])
 
 
-class WebhookEventSerializer(serializers.Serializer):
-    readyToStream = serializers.BooleanField()
-    readyToStreamAt = serializers.DateTimeField()
-    playback = PlaybackSerializer()
-    thumbnail = serializers.URLField()
-    preview = serializers.URLField()
+class QueuedWebhookEventSerializer(serializers.Serializer):
     uid = serializers.CharField()
-    meta = MetaSerializer()
 
     def save(self):
-        ready = self.validated_data["readyToStream"]
-        if ready:
-            creator = User.objects.get(
-                username=self.validated_data["meta"]["firebase_uid"]
-            )
-            starring = User.objects.get(
-                username=self.validated_data["meta"]["starring_firebase_uid"]
-            )
-            location = Point(
-                float(self.validated_data["meta"]["longitude"]),
-                float(self.validated_data["meta"]["latitude"]),
-                srid=4326,
-            )
-            video, created = Video.objects.update_or_create(
-                cloudflare_uid=self.validated_data["uid"],
-                defaults={
-                    "creator": creator,
-                    "starring": starring,
-                    "location": location,
-                    "thumbnail": self.validated_data["thumbnail"],
-                    "preview": self.validated_data["preview"],
-                    "hls": f"{self.validated_data['playback']['hls']}?clientBandwidthHint=10",
-                    "money_spent": self.validated_data["meta"]["money_spent"],
-                    "currency": self.validated_data["meta"]["currency"],
-                    "uploaded_at": self.validated_data["readyToStreamAt"],
-                },
-            )
-            if (
-                created
-                and not Video.objects.filter(location__distance_lte=(location, D(mi=1)))
-                .exclude(id=video.id)
-                .exists()
-            ):
-                starring.points += 1000
-                starring.save()
-                creator.points += 1000
-                creator.save()
+        webhooks.queue(self.initial_data)
 
 
 class UserRankSerializer(serializers.ModelSerializer):
@@ -159,9 +114,24 @@ class UserRankSerializer(serializers.ModelSerializer):
         fields = ["rank", "points"]
 
     def get_rank(self, obj):
-        user_points = obj.points
-        num_users_ranked_above = User.objects.filter(points__gt=user_points).count()
-        return num_users_ranked_above + 1
+        return leaderboard.rank(obj.points)
+
+
+class LeaderboardQueryParamSerializer(serializers.Serializer):
+    cursor = serializers.CharField(required=False)
+
+    def validate_cursor(self, value):
+        try:
+            return leaderboard.decode_cursor(value)
+        except (signing.BadSignature, ValueError):
+            raise serializers.ValidationError("Invalid cursor")
+
+
+class LeaderboardSerializer(serializers.Serializer):
+    rank = serializers.IntegerField()
+    username = serializers.CharField()
+    display_name = serializers.CharField()
+    points = serializers.IntegerField()
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -198,6 +168,7 @@ class BlockBuddySerializer(serializers.Serializer):
             raise serializers.ValidationError("User is not your buddy")
         user.buddies.remove(buddy)
         user.blocked_users.add(buddy)
+        forget_exclusions(user, buddy)
         return {}
 
 
@@ -206,7 +177,6 @@ class VideoUploadSerializer(serializers.Serializer):
     location = serializers.URLField(read_only=True)
 
     def create(self, validated_data):
-        endpoint = f"https://api.cloudflare.com/client/v4/accounts/{os.environ.get('CLOUDFLARE_ACCOUNT_ID')}/stream?direct_user=true"
         max_duration = base64.b64encode(b"30").decode("utf-8")
         expiry = base64.b64encode(
             (datetime.datetime.utcnow() + datetime.timedelta(days=1))
@@ -216,15 +186,14 @@ class VideoUploadSerializer(serializers.Serializer):
         firebase_uid = base64.b64encode(
             self.context["request"].user.username.encode()
         ).decode("utf-8")
-        headers = {
-            "Authorization": f"bearer {os.environ.get('CLOUDFLARE_API_TOKEN')}",
-            "Tus-Resumable": "1.0.0",
-            "Upload-Length": self.context["request"].headers["Upload-Length"],
-            "Upload-Metadata": f"maxDurationSeconds {max_duration}, expiry {expiry}, firebase_uid {firebase_uid}, "
-            + self.context["request"].headers["Upload-Metadata"],
-        }
-
-        response = requests.request("POST", endpoint, headers=headers)
+        try:
+            response = cloudflare.client.create_direct_upload(
+                self.context["request"].headers["Upload-Length"],
+                f"maxDurationSeconds {max_duration}, expiry {expiry}, firebase_uid {firebase_uid}, "
+                + self.context["request"].headers["Upload-Metadata"],
+            )
+        except requests.RequestException:
+            raise CloudflareUnavailable()
         return {
             "location": response.headers.get("Location"),
         }
@@ -246,8 +215,11 @@ class VideoUploadSerializer(serializers.Serializer):
         return data
 
     def validate_creator(self, creator):
-        user = auth.get_user(creator.username)
-        if not user.email_verified:
+        # Tokens carry email_verified, so Firebase is only asked when it is missing.
+        email_verified = (self.context["request"].auth or {}).get("email_verified")
+        if email_verified is None:
+            email_verified = firebase.email_verified(creator.username)
+        if not email_verified:
             raise serializers.ValidationError("Verified email address required")
         return creator
 
@@ -262,82 +234,103 @@ class VideoBlockSerializer(serializers.Serializer):
 
     def update(self, instance, validated_data):
         user = validated_data.get("creator")
-        user.blocked_users.add(instance.creator)
-        user.save()
+        interactions.block(user, instance.creator)
+        forget_exclusions(user, instance.creator)
         return instance
 
 
 class VideoHideSerializer(serializers.Serializer):
     def update(self, instance, validated_data):
         user = self.context["request"].user
-        instance.hidden_from.add(user)
-        instance.save()
+        interactions.hide(user, instance)
+        forget_exclusions(user)
         return instance
 
 
 class VideoWentSerializer(serializers.Serializer):
     def update(self, instance, validated_data):
         user = self.context["request"].user
-        if (
-            not instance.directions_requested_by.filter(username=user.username).exists()
-            and instance.creator != user
-        ):
-            num_creators_around = 1 + (
-                Video.objects.filter(
-                    location__distance_lte=(instance.location, D(mi=1))
-                )
-                .exclude(creator=instance.creator)
-                .order_by("creator")
-                .distinct("creator")
-                .count()
-            )
-            creator = instance.creator
-            creator.points += 10 * num_creators_around
-            creator.save()
-            starring = instance.starring
-            starring.points += 10 * num_creators_around
-            starring.save()
-        instance.directions_requested_by.add(user)
-        instance.save()
+        interactions.request_directions(user, instance)
         return instance
 
 
 class VideoReportSerializer(serializers.Serializer):
     def update(self, instance, validated_data):
         user = self.context["request"].user
-        instance.reported_by.add(user)
-        instance.save()
-        context = {"reported_video_id": str(instance.id)}
-        html_message = render_to_string("reported_video.html", context=context)
-        plain_message = strip_tags(html_message)
-
-        message = EmailMultiAlternatives(
-            subject=f"Video reported",
-            from_email=f"FlitFlok <{os.environ.get('EMAIL_HOST_USER')}>",
-            body=plain_message,
-            to=[os.environ.get("EMAIL_HOST_USER")],
-        )
-
-        message.attach_alternative(html_message, "text/html")
-        message.send()
+        reports.report(instance, user)
+        forget_exclusions(user)
         return instance
 
 
+class QueuedInteractionSerializer(serializers.Serializer):
+    video = serializers.UUIDField()
+    action = serializers.ChoiceField(choices=["hide", "report", "went", "block"])
+
+
+class VideoInteractionsSerializer(serializers.Serializer):
+    interactions = QueuedInteractionSerializer(many=True, max_length=100)
+
+    def create(self, validated_data):
+        actions = [
+            (interaction["video"], interaction["action"])
+            for interaction in validated_data["interactions"]
+        ]
+        results = interactions.apply(self.context["request"].user, actions)
+        return [
+            {"video": video_id, "action": action, "result": result}
+            for (video_id, action), result in zip(actions, results)
+        ]
+
+
 class VideoQueryParamSerializer(serializers.Serializer):
     latitude = serializers.FloatField()
     longitude = serializers.FloatField()
     current_video = serializers.UUIDField(required=False)
+    cursor = serializers.CharField(required=False)
 
     def validate_current_video(self, value):
         if not Video.objects.filter(id=value).exists():
             raise serializers.ValidationError("Current video does not exist")
         return value
 
+    def validate_cursor(self, value):
+        try:
+            return decode_cursor(value)
+        except (signing.BadSignature, ValueError):
+            raise serializers.ValidationError("Invalid cursor")
+
+    def validate(self, data):
+        if "cursor" in data and "current_video" in data:
+            raise serializers.ValidationError(
+                "Cannot page by both cursor and current video"
+            )
+        return data
+
+
+class VideosBlockedQueryParamSerializer(serializers.Serializer):
+    since = serializers.DateTimeField(required=False)
+    limit = serializers.IntegerField(
+        required=False, min_value=1, max_value=CREATOR_PAGE_MAX
+    )
+
+
+class CreatorVideosQueryParamSerializer(VideosBlockedQueryParamSerializer):
+    cursor = serializers.CharField(required=False)
+
+    def validate_cursor(self, value):
+        try:
+            cursor = decode_creator_cursor(value)
+        except (signing.BadSignature, ValueError):
+            raise serializers.ValidationError("Invalid cursor")
+        if cursor[0] != self.context["creator_id"]:
+            raise serializers.ValidationError("Cursor is for another creator")
+        return cursor
+
 
 class VideoResultsSerializer(GeoFeatureModelSerializer):
     distance = serializers.SerializerMethodField()
     posted_at = serializers.SerializerMethodField()
-    starring_rank = serializers.SerializerMethodField()
+    starring_rank = serializers.ReadOnlyField()
     starring = serializers.ReadOnlyField(source="starring.username")
     display_name = serializers.ReadOnlyField(source="starring.display_name")
 
@@ -363,11 +356,6 @@ class VideoResultsSerializer(GeoFeatureModelSerializer):
     def get_distance(self, obj):
         return f"{round(obj.distance.km, 1)} km"
 
-    def get_starring_rank(self, obj):
-        user_points = obj.starring.points
-        num_users_ranked_above = User.objects.filter(points__gt=user_points).count()
-        return num_users_ranked_above + 1
-
 
 class SentBuddyRequestsSerializer(serializers.ModelSerializer):
     receiver_display_name = serializers.ReadOnlyField(source="receiver.display_name")
@@ -385,13 +373,3 @@ class ReceivedBuddyRequestsSerializer(serializers.ModelSerializer):
     class Meta:
         model = BuddyRequest
         fields = ("id", "sender_display_name", "sender_username")
-
-
-class VideosBlockedSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = Video
-        fields = ("id",)
-
-    def to_representation(self, instance):
-        video = super().to_representation(instance)
-        return video["id"]
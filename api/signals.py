@@ -0,0 +1,37 @@
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from api import leaderboard
+from api.models import User
+from api.principals import forget_principal
+
+
+@receiver(post_save, sender=User)
+def move_on_leaderboard(sender, instance, created, update_fields, **kwargs):
+    if "points" not in instance.__dict__:
+        return
+    if update_fields is not None and "points" not in update_fields:
+        return
+    if not instance.__dict__.get("is_active", True):
+        return
+    saved_points = 0 if created else getattr(instance, "saved_points", None)
+    if saved_points is None:
+        return
+    leaderboard.move(saved_points, instance.points)
+    instance.saved_points = instance.points
+
+
+@receiver(pre_delete, sender=User)
+def load_points(sender, instance, **kwargs):
+    # Authenticated users are loaded without their points.
+    missing = {"points", "is_active"} - instance.__dict__.keys()
+    if instance.pk and missing:
+        instance.refresh_from_db(fields=sorted(missing))
+
+
+@receiver(post_delete, sender=User)
+def leave_leaderboard(sender, instance, **kwargs):
+    # Users awaiting deletion left the leaderboard when they were deactivated.
+    if "points" in instance.__dict__ and instance.__dict__.get("is_active", True):
+        leaderboard.move(instance.points, 0)
+    forget_principal(instance.username)
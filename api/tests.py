@@ -1,3 +1,134 @@
-from django.test import TestCase
+import json
+import tempfile
+import time
+from io import StringIO
 
-# Create your tests here.
+import jwt
+from cryptography.hazmat.primitives.asymmetric import rsa
+from django.core.cache import cache, caches
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, TestCase
+
+from api.authentication import VerifiedTokenCache
+from api.models import User
+from api.principals import GENERATION_KEY, principal
+from api.tokens import FirebaseTokenVerifier
+
+
+class VerifiedTokenCacheTest(SimpleTestCase):
+    def test_keeps_tokens_until_expiry(self):
+        tokens = VerifiedTokenCache()
+        exp = time.time() + 60
+        tokens.set("live", {"uid": "hello", "exp": exp})
+        tokens.set("expired", {"uid": "goodbye", "exp": time.time() - 1})
+        assert tokens.get("live") == {"uid": "hello", "exp": exp}
+        assert tokens.get("expired") is None
+        assert tokens.get("unknown") is None
+        assert (tokens.hits, tokens.misses) == (1, 2)
+
+    def test_evicts_least_recently_used_token(self):
+        tokens = VerifiedTokenCache(max_size=2)
+        exp = time.time() + 60
+        tokens.set("first", {"uid": "first", "exp": exp})
+        tokens.set("second", {"uid": "second", "exp": exp})
+        tokens.get("first")
+        tokens.set("third", {"uid": "third", "exp": exp})
+        assert tokens.get("second") is None
+        assert tokens.get("first")["uid"] == "first"
+        assert tokens.get("third")["uid"] == "third"
+
+
+class FirebaseTokenVerifierTest(SimpleTestCase):
+    def setUp(self):
+        self.private_key = rsa.generate_private_key(
+            public_exponent=65537, key_size=2048
+        )
+        public_key = json.loads(
+            jwt.algorithms.RSAAlgorithm.to_jwk(self.private_key.public_key())
+        )
+        keys_file = tempfile.NamedTemporaryFile("w", suffix=".json")
+        json.dump({"keys": [{**public_key, "kid": "local", "alg": "RS256"}]}, keys_file)
+        keys_file.flush()
+        self.addCleanup(keys_file.close)
+        self.verifier = FirebaseTokenVerifier("flitflok", keys_file=keys_file.name)
+
+    def sign(self, kid="local", **claims):
+        now = int(time.time())
+        return jwt.encode(
+            {
+                "iss": "https://securetoken.google.com/flitflok",
+                "aud": "flitflok",
+                "sub": "hello",
+                "iat": now,
+                "exp": now + 3600,
+                "auth_time": now,
+                **claims,
+            },
+            self.private_key,
+            algorithm="RS256",
+            headers={"kid": kid},
+        )
+
+    def test_verifies_token_with_local_keys(self):
+        decoded_token = self.verifier.verify(self.sign())
+        assert decoded_token["uid"] == "hello"
+        assert self.verifier.refresher is None
+
+    def test_rejects_invalid_tokens(self):
+        for token in [
+            self.sign(kid="unknown"),
+            self.sign(aud="another-project"),
+            self.sign(iss="https://securetoken.google.com/another-project"),
+            self.sign(exp=int(time.time()) - 1),
+            self.sign(sub=""),
+            self.sign(auth_time=int(time.time()) + 3600),
+        ]:
+            with self.assertRaises(jwt.PyJWTError):
+                self.verifier.verify(token)
+
+
+class PrincipalTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        caches["principals"].clear()
+
+    def test_creates_user_once_and_caches_id(self):
+        user = principal("hello")
+        assert user.pk == User.objects.get(username="hello").pk
+        with self.assertNumQueries(0):
+            assert principal("hello").pk == user.pk
+
+    def test_other_workers_forget_principal_once_generation_is_reread(self):
+        user = principal("hello")
+        User.objects.filter(pk=user.pk).update(is_active=False)
+        # As another worker would, bump the generation without clearing the
+        # local copy of it.
+        cache.set(GENERATION_KEY, "bumped", None)
+        assert principal("hello").pk == user.pk
+        caches["principals"].delete(GENERATION_KEY)
+        assert principal("hello") is None
+
+    def test_loads_rest_of_row_on_first_deferred_field(self):
+        User.objects.create(username="hello", display_name="Hello", points=10)
+        user = principal("hello")
+        with self.assertNumQueries(1):
+            assert user.display_name == "Hello"
+            assert user.points == user.saved_points == 10
+
+    def test_forgets_deleted_user(self):
+        user = principal("hello")
+        deleted_id = user.pk
+        user.delete()
+        assert principal("hello").pk != deleted_id
+
+
+class ProfileStartupTest(SimpleTestCase):
+    def test_reports_import_time_of_app_modules(self):
+        out = StringIO()
+        call_command("profile_startup", stdout=out)
+        assert "api.models" in out.getvalue()
+        assert "api.views" in out.getvalue()
+
+    def test_enforces_boot_time_budget(self):
+        with self.assertRaises(CommandError):
+            call_command("profile_startup", budget=0, stdout=StringIO())
@@ -0,0 +1,97 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+import jwt
+import requests
+
+logger = logging.getLogger(__name__)
+
+FIREBASE_JWKS_URL = "https://www.googleapis.com/service_accounts/v1/jwk/securetoken@system.gserviceaccount.com"
+# Keys are refreshed once this fraction of their Cache-Control max-age has
+# passed, leaving the rest of it to retry a failed fetch.
+REFRESH_AT = 0.8
+RETRY_SECONDS = 60
+DEFAULT_MAX_AGE = 60 * 60
+INITIAL_LOAD_TIMEOUT = 10
+MAX_AGE = re.compile(r"max-age=(\d+)")
+
+
+class FirebaseTokenVerifier:
+    """Verifies Firebase ID tokens against signing keys held in memory.
+
+    Keys come from FIREBASE_PUBLIC_KEYS_FILE when it is set, otherwise from
+    Google's JWKS endpoint, refreshed by a background thread before they
+    expire so that requests never wait on a key fetch.
+    """
+
+    def __init__(self, project_id, keys_file=None, jwks_url=FIREBASE_JWKS_URL):
+        self.project_id = project_id
+        self.keys_file = keys_file
+        self.jwks_url = jwks_url
+        self.keys = {}
+        # Set once the first load has been attempted, successful or not.
+        self.ready = threading.Event()
+        self.lock = threading.Lock()
+        self.refresher = None
+        if keys_file:
+            self.load(self.read_keys_file())
+            self.ready.set()
+
+    def read_keys_file(self):
+        with open(self.keys_file) as keys_file:
+            return json.load(keys_file)
+
+    def fetch(self):
+        response = requests.get(self.jwks_url, timeout=10)
+        response.raise_for_status()
+        max_age = MAX_AGE.search(response.headers.get("Cache-Control", ""))
+        self.load(response.json())
+        return int(max_age.group(1)) if max_age else DEFAULT_MAX_AGE
+
+    def load(self, jwks):
+        self.keys = {key.key_id: key for key in jwt.PyJWKSet.from_dict(jwks).keys}
+
+    def refresh_forever(self):
+        while True:
+            try:
+                wait = max(self.fetch() * REFRESH_AT, RETRY_SECONDS)
+            except (requests.RequestException, ValueError, jwt.PyJWTError):
+                logger.exception("Could not refresh Firebase signing keys")
+                wait = RETRY_SECONDS
+            self.ready.set()
+            time.sleep(wait)
+
+    def start(self):
+        # Threads do not survive a fork, so each worker starts its own.
+        with self.lock:
+            if self.keys_file or (self.refresher and self.refresher.is_alive()):
+                return
+            self.refresher = threading.Thread(
+                target=self.refresh_forever, name="firebase-keys", daemon=True
+            )
+            self.refresher.start()
+
+    def verify(self, token):
+        self.start()
+        self.ready.wait(INITIAL_LOAD_TIMEOUT)
+        key_id = jwt.get_unverified_header(token).get("kid")
+        if key_id not in self.keys:
+            raise jwt.InvalidKeyError("Token is signed with an unknown key.")
+        decoded_token = jwt.decode(
+            token,
+            self.keys[key_id].key,
+            algorithms=["RS256"],
+            audience=self.project_id,
+            issuer=f"https://securetoken.google.com/{self.project_id}",
+            options={"require": ["exp", "iat", "aud", "iss", "sub"]},
+        )
+        if not decoded_token["sub"] or len(decoded_token["sub"]) > 128:
+            raise jwt.InvalidTokenError("Token has an invalid subject.")
+        if decoded_token.get("auth_time", 0) > time.time():
+            raise jwt.ImmatureSignatureError("Token was authenticated in the future.")
+        decoded_token["uid"] = decoded_token["sub"]
+        return decoded_token
@@ -8,9 +8,12 @@ urlpatterns = [
     path(r"delete-account/", views.DeleteAccountView.as_view()),
     path(r"video/", views.VideoView.as_view()),
     path(r"rank/", views.RankView.as_view()),
+    path(r"leaderboard/", views.LeaderboardView.as_view()),
+    path(r"video/interactions/", views.VideoInteractionsView.as_view()),
     path(r"video/<uuid:pk>/hide/", views.VideoHideView.as_view()),
     path(r"video/<uuid:pk>/report/", views.VideoReportView.as_view()),
     path(r"video/<uuid:pk>/block/", views.VideoBlockView.as_view()),
+    path(r"video/<uuid:pk>/creator-videos/", views.CreatorVideosView.as_view()),
     path(r"video/<uuid:pk>/went/", views.VideoWentView.as_view()),
     path(r"video-upload/", views.VideoUploadView.as_view()),
     path(r"cloudflare-webhook/", views.CloudflareWebhookView.as_view()),
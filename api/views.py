@@ -1,13 +1,20 @@
 import logging
 
-from django.contrib.gis.db.models.functions import Distance
+from django.conf import settings
 from django.contrib.gis.geos import Point
-from firebase_admin.auth import delete_user
 from rest_framework import status
 from rest_framework.generics import get_object_or_404
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from api import accounts, leaderboard
+from api.feed import (
+    nearest_videos,
+    encode_cursor,
+    FEED_PAGE_SIZE,
+    creator_video_ids,
+    encode_creator_cursor,
+)
 from api.models import Video, User, BuddyRequest
 from api.permissions import IsFromCloudflare
 from api.serializers import (
@@ -16,13 +23,18 @@ from api.serializers import (
     VideoResultsSerializer,
     VideoHideSerializer,
     VideoReportSerializer,
+    VideoInteractionsSerializer,
     VideoBlockSerializer,
-    VideosBlockedSerializer,
+    VideosBlockedQueryParamSerializer,
+    CreatorVideosQueryParamSerializer,
     VideoWentSerializer,
     UserRankSerializer,
+    LeaderboardQueryParamSerializer,
+    LeaderboardSerializer,
     DisplayNameSerializer,
     VideoUploadSerializer,
     WebhookEventSerializer,
+    QueuedWebhookEventSerializer,
     BuddyRequestSerializer,
     AcceptBuddyRequestSerializer,
     DeclineBuddyRequestSerializer,
@@ -129,6 +141,11 @@ class CloudflareWebhookView(APIView):
     permission_classes = [IsFromCloudflare]
 
     def post(self, request):
+        if settings.CLOUDFLARE_WEBHOOK_QUEUE:
+            serializer = QueuedWebhookEventSerializer(data=request.data)
+            serializer.is_valid(raise_exception=True)
+            serializer.save()
+            return Response(status=status.HTTP_202_ACCEPTED)
         serializer = WebhookEventSerializer(
             data=request.data,
         )
@@ -177,6 +194,21 @@ class RankView(APIView):
         return Response(serializer.data)
 
 
+class LeaderboardView(APIView):
+    def get(self, request):
+        params = LeaderboardQueryParamSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        entries = leaderboard.page(params.validated_data.get("cursor"))
+        serializer = LeaderboardSerializer(entries, many=True)
+        headers = {}
+        if len(entries) == leaderboard.LEADERBOARD_PAGE_SIZE:
+            headers = {
+                "Access-Control-Expose-Headers": "Next-Cursor",
+                "Next-Cursor": leaderboard.encode_cursor(entries[-1]),
+            }
+        return Response(serializer.data, status=status.HTTP_200_OK, headers=headers)
+
+
 class EulaAgreedView(APIView):
     def get(self, request):
         serializer = UserSerializer(request.user)
@@ -194,11 +226,20 @@ class EulaAgreedView(APIView):
 
 class DeleteAccountView(APIView):
     def delete(self, request):
-        delete_user(request.user.username)
-        request.user.delete()
+        accounts.request_deletion(request.user)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
+class VideoInteractionsView(APIView):
+    def post(self, request):
+        serializer = VideoInteractionsSerializer(
+            data=request.data, context={"request": request}
+        )
+        serializer.is_valid(raise_exception=True)
+        results = serializer.save()
+        return Response(results, status=status.HTTP_200_OK)
+
+
 class VideoReportView(APIView):
     def patch(self, request, pk):
         video = get_object_or_404(Video, pk=pk)
@@ -232,18 +273,44 @@ class VideoWentView(APIView):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
+def creator_videos_response(creator_id, params):
+    limit = params.get("limit")
+    videos = creator_video_ids(
+        creator_id, since=params.get("since"), cursor=params.get("cursor"), limit=limit
+    )
+    headers = {}
+    if limit and len(videos) == limit:
+        headers = {
+            "Access-Control-Expose-Headers": "Next-Cursor",
+            "Next-Cursor": encode_creator_cursor(creator_id, videos[-1]),
+        }
+    return Response(
+        [video["id"] for video in videos], status=status.HTTP_200_OK, headers=headers
+    )
+
+
 class VideoBlockView(APIView):
     def patch(self, request, pk):
+        params = VideosBlockedQueryParamSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
         video = get_object_or_404(Video, pk=pk)
         serializer = VideoBlockSerializer(
             video, data=request.data, context={"request": request}
         )
         serializer.is_valid(raise_exception=True)
         video = serializer.save()
-        blocked_videos = VideosBlockedSerializer(
-            video.creator.video_set.all().order_by("-uploaded_at"), many=True
+        # Later pages come from CreatorVideosView, without blocking again.
+        return creator_videos_response(video.creator_id, params.validated_data)
+
+
+class CreatorVideosView(APIView):
+    def get(self, request, pk):
+        video = get_object_or_404(Video.objects.only("creator_id"), pk=pk)
+        params = CreatorVideosQueryParamSerializer(
+            data=request.query_params, context={"creator_id": video.creator_id}
         )
-        return Response(blocked_videos.data, status=status.HTTP_200_OK)
+        params.is_valid(raise_exception=True)
+        return creator_videos_response(video.creator_id, params.validated_data)
 
 
 class VideoView(APIView):
@@ -253,23 +320,17 @@ class VideoView(APIView):
         latitude = params.validated_data["latitude"]
         longitude = params.validated_data["longitude"]
         current_location = Point(longitude, latitude, srid=4326)
-        videos = (
-            Video.objects.exclude(reported_by=self.request.user)
-            .exclude(hidden_from=self.request.user)
-            .exclude(creator__in=self.request.user.blocked_users.all())
-            .annotate(distance=Distance("location", current_location, spheroid=True))
+        videos = nearest_videos(
+            self.request.user,
+            current_location,
+            after_video=params.validated_data.get("current_video"),
+            cursor=params.validated_data.get("cursor"),
         )
-        if current_video_id := params.validated_data.get("current_video"):
-            current_video = Video.objects.get(id=current_video_id)
-            videos = videos.filter(
-                distance__gt=Distance(
-                    current_video.location, current_location, spheroid=True
-                )
-            )
-        videos = videos.order_by(
-            "distance",
-            "-creator__points",
-            "-uploaded_at",
-        )[:5]
         results = VideoResultsSerializer(videos, many=True)
-        return Response(results.data, status=status.HTTP_200_OK)
+        headers = {}
+        if len(videos) == FEED_PAGE_SIZE:
+            headers = {
+                "Access-Control-Expose-Headers": "Next-Cursor",
+                "Next-Cursor": encode_cursor(videos[FEED_PAGE_SIZE - 1]),
+            }
+        return Response(results.data, status=status.HTTP_200_OK, headers=headers)
@@ -0,0 +1,32 @@
+import decimal
+
+from rest_framework import serializers
+
+from api.models import CURRENCY_CHOICES
+
+
+class PlaybackSerializer(serializers.Serializer):
+    hls = serializers.URLField()
+
+
+class MetaSerializer(serializers.Serializer):
+    firebase_uid = serializers.CharField()
+    starring_firebase_uid = serializers.CharField()
+    latitude = serializers.CharField()
+    longitude = serializers.CharField()
+    currency = serializers.ChoiceField(choices=CURRENCY_CHOICES)
+    money_spent = serializers.DecimalField(
+        max_digits=14, decimal_places=2, min_value=decimal.Decimal("0.00")
+    )
+
+
+class WebhookPayloadSerializer(serializers.Serializer):
+    """Validates a Cloudflare Stream video, as sent by webhook or listed."""
+
+    readyToStream = serializers.BooleanField()
+    readyToStreamAt = serializers.DateTimeField()
+    playback = PlaybackSerializer()
+    thumbnail = serializers.URLField()
+    preview = serializers.URLField()
+    uid = serializers.CharField()
+    meta = MetaSerializer()
@@ -0,0 +1,160 @@
+import logging
+
+from django.contrib.gis.geos import Point
+from django.contrib.gis.measure import D
+from django.db import transaction
+
+from api import points
+from api.feed import bump_video_set_version
+from api.models import PointsLedgerEntry, User, Video, WebhookEvent
+from api.neighbourhood import join_neighbourhoods
+from api.webhook_payloads import WebhookPayloadSerializer
+
+logger = logging.getLogger(__name__)
+
+INGEST_BATCH_SIZE = 100
+# Events that fail this many times are left in the queue, with their error,
+# for someone to look at instead of being retried by every drain.
+MAX_INGEST_ATTEMPTS = 3
+UPSERTED_FIELDS = [
+    "creator",
+    "starring",
+    "location",
+    "thumbnail",
+    "preview",
+    "hls",
+    "money_spent",
+    "currency",
+    "uploaded_at",
+]
+
+
+def ingest(events):
+    """Upserts the videos of validated webhook events that are ready to stream.
+
+    Returns the videos that were new, in the order they became ready.
+    """
+    events = [event for event in events if event["readyToStream"]]
+    usernames = {event["meta"]["firebase_uid"] for event in events} | {
+        event["meta"]["starring_firebase_uid"] for event in events
+    }
+    users = User.objects.in_bulk(usernames, field_name="username")
+    videos = {}
+    for event in events:
+        meta = event["meta"]
+        if not {meta["firebase_uid"], meta["starring_firebase_uid"]} <= users.keys():
+            logger.warning("Skipping video %s from an unknown user", event["uid"])
+            continue
+        videos[event["uid"]] = Video(
+            cloudflare_uid=event["uid"],
+            creator=users[meta["firebase_uid"]],
+            starring=users[meta["starring_firebase_uid"]],
+            location=Point(
+                float(meta["longitude"]), float(meta["latitude"]), srid=4326
+            ),
+            thumbnail=event["thumbnail"],
+            preview=event["preview"],
+            hls=f"{event['playback']['hls']}?clientBandwidthHint=10",
+            money_spent=meta["money_spent"],
+            currency=meta["currency"],
+            uploaded_at=event["readyToStreamAt"],
+        )
+    if not videos:
+        return []
+
+    with transaction.atomic():
+        existing = set(
+            Video.objects.filter(cloudflare_uid__in=videos).values_list(
+                "cloudflare_uid", flat=True
+            )
+        )
+        Video.objects.bulk_create(
+            videos.values(),
+            update_conflicts=True,
+            unique_fields=["cloudflare_uid"],
+            update_fields=UPSERTED_FIELDS,
+        )
+        created = sorted(
+            (video for uid, video in videos.items() if uid not in existing),
+            key=lambda video: video.uploaded_at,
+        )
+        if created:
+            join_neighbourhoods(created)
+        # Videos are awarded as if they arrived one at a time, so later videos
+        # in the batch do not count against earlier ones.
+        later = {video.id for video in created}
+        for video in created:
+            later.discard(video.id)
+            if (
+                not Video.objects.filter(
+                    location__distance_lte=(video.location, D(mi=1))
+                )
+                .exclude(id=video.id)
+                .exclude(id__in=later)
+                .exists()
+            ):
+                points.award(
+                    [video.creator, video.starring],
+                    1000,
+                    PointsLedgerEntry.Reason.FIRST_VIDEO_AROUND,
+                    video=video,
+                )
+    bump_video_set_version()
+    return created
+
+
+def queue(payload):
+    """Stores an event for ingestion, replacing any queued event for its video."""
+    WebhookEvent.objects.bulk_create(
+        [WebhookEvent(uid=payload["uid"], payload=payload)],
+        update_conflicts=True,
+        unique_fields=["uid"],
+        update_fields=["payload", "received_at", "attempts", "error"],
+    )
+
+
+def drain(batch_size=INGEST_BATCH_SIZE):
+    """Ingests and removes up to batch_size queued events, oldest first.
+
+    Workers draining at the same time skip each other's locked events. Should
+    the batch fail, its events are ingested one at a time and those that
+    still fail are kept with their error and attempt count.
+    """
+    with transaction.atomic():
+        queued = list(
+            WebhookEvent.objects.select_for_update(skip_locked=True)
+            .filter(attempts__lt=MAX_INGEST_ATTEMPTS)
+            .order_by("received_at")[:batch_size]
+        )
+        events = {}
+        for event in queued:
+            serializer = WebhookPayloadSerializer(data=event.payload)
+            if serializer.is_valid():
+                events[event.id] = serializer.validated_data
+            else:
+                logger.warning(
+                    "Dropping invalid webhook event %s: %s",
+                    event.uid,
+                    serializer.errors,
+                )
+        failed = []
+        try:
+            with transaction.atomic():
+                ingest(list(events.values()))
+        except Exception:
+            for event in queued:
+                if event.id not in events:
+                    continue
+                try:
+                    with transaction.atomic():
+                        ingest([events[event.id]])
+                except Exception as exc:
+                    logger.exception("Could not ingest webhook event %s", event.uid)
+                    event.attempts += 1
+                    event.error = repr(exc)
+                    failed.append(event)
+        WebhookEvent.objects.bulk_update(failed, ["attempts", "error"])
+        WebhookEvent.objects.filter(
+            id__in=[event.id for event in queued if event not in failed]
+        ).delete()
+    return len(queued)
@@ -0,0 +1,83 @@
+import json
+import threading
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+from urllib.parse import parse_qs, urlsplit
+
+from api import cloudflare
+
+
+class CloudflareStub:
+    """Local stand-in for the Cloudflare Stream API.
+
+    Used as a context manager, it serves on a free local port and points
+    api.cloudflare.client at itself. Every request is recorded, and
+    responses can be queued to fail with given status codes. Videos in
+    undeletable always fail to delete.
+    """
+
+    def __init__(self):
+        self.requests = []
+        self.failures = []
+        self.videos = []
+        self.undeletable = set()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.respond(self, 200, {"success": True, "result": stub.listing(self)})
+
+            def do_POST(self):
+                location = f"{stub.url}/tus/{uuid.uuid4().hex}"
+                stub.respond(self, 201, None, {"Location": location})
+
+            def do_DELETE(self):
+                if self.path.rsplit("/", 1)[-1] in stub.undeletable:
+                    stub.respond(self, 500, {"success": False})
+                else:
+                    stub.respond(self, 200, {"success": True})
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+
+    def listing(self, handler):
+        # Like Stream's list API: oldest first from an inclusive start date.
+        query = parse_qs(urlsplit(handler.path).query)
+        start = query.get("start", [""])[0]
+        limit = int(query.get("limit", [1000])[0])
+        videos = sorted(self.videos, key=lambda video: video["created"])
+        return [video for video in videos if video["created"] >= start][:limit]
+
+    def fail(self, *statuses):
+        self.failures.extend(statuses)
+
+    def respond(self, handler, status, body, headers=None):
+        self.requests.append((handler.command, handler.path, dict(handler.headers)))
+        if self.failures:
+            status, body, headers = self.failures.pop(0), {"success": False}, None
+        handler.send_response(status)
+        for header, value in (headers or {}).items():
+            handler.send_header(header, value)
+        handler.send_header("Content-Type", "application/json")
+        handler.end_headers()
+        if body is not None:
+            handler.wfile.write(json.dumps(body).encode())
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.client = mock.patch.object(
+            cloudflare,
+            "client",
+            cloudflare.CloudflareStream("account", "token", self.url),
+        )
+        self.client.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.client.stop()
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,138 @@
+import datetime
+from http import HTTPStatus
+from unittest import mock
+
+from django.contrib import admin
+from django.contrib.gis.geos import Point
+from rest_framework.test import APITestCase
+
+from api import cloudflare
+from api.admin import VideoModelAdmin
+from api.models import User, Video
+from functional_tests.cloudflare_stub import CloudflareStub
+
+
+class CloudflareClientTest(APITestCase):
+    def create_video(self, cloudflare_uid="af95bfce3e887accd1fe9796f741b5f1"):
+        user, _ = User.objects.get_or_create(username="hello world")
+        return Video.objects.create(
+            cloudflare_uid=cloudflare_uid,
+            creator=user,
+            hls="https://customer-ar0494u0olvml2w7.cloudflarestream.com/af95bfce3e887accd1fe9796f741b5f1/manifest/video.m3u8",
+            thumbnail="https://customer-ar0494u0olvml2w7.cloudflarestream.com/af95bfce3e887accd1fe9796f741b5f1/manifest/video.m3u8",
+            preview="https://customer-ar0494u0olvml2w7.cloudflarestream.com/af95bfce3e887accd1fe9796f741b5f1/watch",
+            location=Point(-0.03338590123538324, 51.512863471620285, srid=4326),
+            starring=user,
+            uploaded_at=datetime.datetime(2024, 1, 1, 1, 1, 1),
+        )
+
+    def test_gets_upload_location_from_stream_api(self):
+        user = User.objects.create(username="zVAvUkRbSbgZCSnZ64hU9PyutCi1")
+        self.client.force_authenticate(user=user, token={"email_verified": True})
+        with CloudflareStub() as stub:
+            response = self.client.post(
+                "/video-upload/",
+                headers={
+                    "Upload-Length": "1690691",
+                    "Upload-Metadata": "name dGVzdA==, starring_firebase_uid LTAuMDMzMzg5MTUzNzQwNzMyNjA1",
+                },
+            )
+        assert response.status_code == HTTPStatus.OK
+        assert response.headers["Location"].startswith(f"{stub.url}/tus/")
+        method, path, headers = stub.requests[0]
+        assert (method, path) == ("POST", "/accounts/account/stream?direct_user=true")
+        assert headers["Authorization"] == "bearer token"
+        assert headers["Upload-Length"] == "1690691"
+        assert headers["Upload-Metadata"].endswith(
+            "name dGVzdA==, starring_firebase_uid LTAuMDMzMzg5MTUzNzQwNzMyNjA1"
+        )
+
+    def test_upload_fails_fast_when_stream_api_is_down(self):
+        user = User.objects.create(username="zVAvUkRbSbgZCSnZ64hU9PyutCi1")
+        self.client.force_authenticate(user=user, token={"email_verified": True})
+        # Nothing listens on the discard port, so connections are refused.
+        unreachable = cloudflare.CloudflareStream(
+            "account", "token", "http://127.0.0.1:9"
+        )
+        with mock.patch.object(cloudflare, "client", unreachable):
+            response = self.client.post(
+                "/video-upload/",
+                headers={
+                    "Upload-Length": "1690691",
+                    "Upload-Metadata": "starring_firebase_uid LTAuMDMzMzg5MTUzNzQwNzMyNjA1",
+                },
+            )
+        assert response.status_code == HTTPStatus.SERVICE_UNAVAILABLE
+
+    def test_retries_failed_video_deletes(self):
+        video = self.create_video()
+        with CloudflareStub() as stub:
+            stub.fail(HTTPStatus.SERVICE_UNAVAILABLE)
+            VideoModelAdmin(Video, admin.site).delete_model(None, video)
+        assert [(method, path) for method, path, _ in stub.requests] == [
+            ("DELETE", f"/accounts/account/stream/{video.cloudflare_uid}"),
+            ("DELETE", f"/accounts/account/stream/{video.cloudflare_uid}"),
+        ]
+        assert not Video.objects.filter(cloudflare_uid=video.cloudflare_uid)
+
+    def test_bulk_deletes_only_videos_deleted_from_cloudflare(self):
+        videos = [self.create_video(f"video-{number}") for number in range(10)]
+        admin_user = User.objects.create_superuser(username="admin", password="admin")
+        self.client.force_login(admin_user)
+        with CloudflareStub() as stub:
+            stub.undeletable = {"video-3"}
+            response = self.client.post(
+                "/admin/api/video/",
+                {
+                    "action": "delete_selected",
+                    "_selected_action": [video.id for video in videos],
+                    "post": "yes",
+                },
+                follow=True,
+            )
+        assert response.status_code == HTTPStatus.OK
+        assert list(Video.objects.values_list("cloudflare_uid", flat=True)) == [
+            "video-3"
+        ]
+        deletes = [path for method, path, _ in stub.requests if method == "DELETE"]
+        assert len(set(deletes)) == 10
+        notices = [str(message) for message in response.context["messages"]]
+        assert "Deleted 9 of 10 videos from Cloudflare." in notices
+        assert any(notice.startswith("Kept 1 videos") for notice in notices)
+        assert not any(notice.startswith("Successfully") for notice in notices)
+
+    def test_bulk_delete_checks_related_objects_first(self):
+        video = self.create_video()
+        admin_user = User.objects.create_superuser(username="admin", password="admin")
+        self.client.force_login(admin_user)
+        with CloudflareStub() as stub, mock.patch.object(
+            VideoModelAdmin,
+            "get_deleted_objects",
+            return_value=([], {}, {"video interaction"}, []),
+        ):
+            response = self.client.post(
+                "/admin/api/video/",
+                {
+                    "action": "delete_selected",
+                    "_selected_action": [video.id],
+                    "post": "yes",
+                },
+            )
+        assert response.status_code == HTTPStatus.FORBIDDEN
+        assert Video.objects.filter(id=video.id).exists()
+        assert not stub.requests
+
+    def test_reports_video_kept_when_cloudflare_cannot_delete_it(self):
+        video = self.create_video("undeletable")
+        admin_user = User.objects.create_superuser(username="admin", password="admin")
+        self.client.force_login(admin_user)
+        with CloudflareStub() as stub:
+            stub.undeletable = {"undeletable"}
+            response = self.client.post(
+                f"/admin/api/video/{video.id}/delete/", {"post": "yes"}, follow=True
+            )
+        assert response.status_code == HTTPStatus.OK
+        assert Video.objects.filter(id=video.id).exists()
+        notices = [str(message) for message in response.context["messages"]]
+        assert any(notice.startswith(f"Kept video {video.id}") for notice in notices)
+        assert not any("deleted successfully" in notice for notice in notices)
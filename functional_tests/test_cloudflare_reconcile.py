@@ -0,0 +1,68 @@
+import datetime
+from io import StringIO
+
+from django.contrib.gis.geos import Point
+from django.core.management import call_command
+from rest_framework.test import APITestCase
+
+from api.models import PendingCloudflareDeletion, User, Video
+from functional_tests.cloudflare_stub import CloudflareStub
+
+
+def listed_video(uid, created, creator, ready=True):
+    return {
+        "uid": uid,
+        "created": created,
+        "readyToStream": ready,
+        "readyToStreamAt": created,
+        "thumbnail": f"https://customer-ar0494u0olvml2w7.cloudflarestream.com/{uid}/thumbnails/thumbnail.jpg",
+        "preview": f"https://customer-ar0494u0olvml2w7.cloudflarestream.com/{uid}/watch",
+        "playback": {
+            "hls": f"https://customer-ar0494u0olvml2w7.cloudflarestream.com/{uid}/manifest/video.m3u8",
+        },
+        "meta": {
+            "firebase_uid": creator,
+            "starring_firebase_uid": creator,
+            "latitude": "51.512863471620285",
+            "longitude": "-0.03338590123538324",
+            "currency": "GBP",
+            "money_spent": "5.67",
+        },
+    }
+
+
+class CloudflareReconcileTest(APITestCase):
+    def test_backfills_missing_videos_and_deletes_orphans(self):
+        creator = User.objects.create(username="creator")
+        Video.objects.create(
+            cloudflare_uid="known",
+            creator=creator,
+            starring=creator,
+            hls="https://customer-ar0494u0olvml2w7.cloudflarestream.com/known/manifest/video.m3u8",
+            thumbnail="https://customer-ar0494u0olvml2w7.cloudflarestream.com/known/thumbnails/thumbnail.jpg",
+            preview="https://customer-ar0494u0olvml2w7.cloudflarestream.com/known/watch",
+            location=Point(-0.03338590123538324, 51.512863471620285, srid=4326),
+            uploaded_at=datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc),
+        )
+        with CloudflareStub() as stub:
+            stub.videos = [
+                listed_video("known", "2024-07-05T19:54:00.000001Z", "creator"),
+                listed_video("missing", "2024-07-05T19:54:00.000002Z", "creator"),
+                listed_video("orphan", "2024-07-05T19:54:00.000002Z", "deleted"),
+                listed_video(
+                    "uploading", "2024-07-05T19:54:00.000003Z", "creator", ready=False
+                ),
+            ]
+            out = StringIO()
+            call_command("reconcile_cloudflare", page_size=2, stdout=out)
+            assert "Listed 4 videos, ingested 1 and queued 1 orphans" in out.getvalue()
+            assert Video.objects.get(cloudflare_uid="missing").creator == creator
+            assert not Video.objects.filter(cloudflare_uid="uploading")
+            assert PendingCloudflareDeletion.objects.get().cloudflare_uid == "orphan"
+
+            call_command("reconcile_cloudflare", delete_orphans=True, stdout=out)
+        assert ("DELETE", "/accounts/account/stream/orphan") in [
+            (method, path) for method, path, _ in stub.requests
+        ]
+        assert not PendingCloudflareDeletion.objects.exists()
+        assert Video.objects.count() == 2
@@ -1,11 +1,41 @@
 import decimal
+import hashlib
+import hmac
+import json
+import os
+from io import StringIO
+from unittest import mock
 
 from django.contrib.gis.geos import Point
+from django.core.management import call_command
+from django.test.utils import override_settings
 from rest_framework.test import APITestCase
 
 from http import HTTPStatus
 
-from api.models import User, Video
+from api import webhooks
+from api.models import User, Video, WebhookEvent
+
+
+def ready_event(uid, creator, ready_at, latitude, longitude):
+    return {
+        "uid": uid,
+        "readyToStream": True,
+        "readyToStreamAt": ready_at,
+        "thumbnail": f"https://customer-ar0494u0olvml2w7.cloudflarestream.com/{uid}/thumbnails/thumbnail.jpg",
+        "preview": f"https://customer-ar0494u0olvml2w7.cloudflarestream.com/{uid}/watch",
+        "playback": {
+            "hls": f"https://customer-ar0494u0olvml2w7.cloudflarestream.com/{uid}/manifest/video.m3u8",
+        },
+        "meta": {
+            "firebase_uid": creator,
+            "starring_firebase_uid": creator,
+            "latitude": latitude,
+            "longitude": longitude,
+            "currency": "GBP",
+            "money_spent": "5.67",
+        },
+    }
 
 
 class CloudflareWebhookTest(APITestCase):
@@ -86,3 +116,96 @@ class CloudflareWebhookTest(APITestCase):
         assert video.money_spent == decimal.Decimal("5.67")
         assert video.currency == "GBP"
         assert video.starring == starring
+
+    @override_settings(CLOUDFLARE_WEBHOOK_QUEUE=True)
+    @mock.patch.dict(os.environ, {"CLOUDFLARE_WEBHOOK_SECRET": "secret"})
+    def post_signed(self, event):
+        body = json.dumps(event)
+        signature = hmac.new(
+            b"secret", f"1720209265.{body}".encode(), hashlib.sha256
+        ).hexdigest()
+        return self.client.post(
+            "/cloudflare-webhook/",
+            data=body,
+            content_type="application/json",
+            headers={"Webhook-Signature": f"time=1720209265,sig1={signature}"},
+        )
+
+    def test_queues_events_and_ingests_them_in_batches(self):
+        User.objects.create(username="first")
+        User.objects.create(username="second")
+        first = ready_event(
+            "first", "first", "2024-07-05T19:54:15Z", "51.512863", "-0.033385"
+        )
+        second = ready_event(
+            "second", "second", "2024-07-05T19:55:15Z", "51.513863", "-0.033385"
+        )
+        for event in [first, first, second]:
+            response = self.post_signed(event)
+            assert response.status_code == HTTPStatus.ACCEPTED
+        assert WebhookEvent.objects.count() == 2
+        assert not Video.objects.exists()
+
+        call_command("ingest_webhook_events", batch_size=1)
+
+        assert not WebhookEvent.objects.exists()
+        first_video = Video.objects.get(cloudflare_uid="first")
+        second_video = Video.objects.get(cloudflare_uid="second")
+        assert first_video.creators_nearby == second_video.creators_nearby == 1
+        assert User.objects.get(username="first").points == 1000
+        assert User.objects.get(username="second").points == 0
+
+    def test_keeps_ingesting_past_an_event_that_fails(self):
+        User.objects.create(username="first")
+        User.objects.create(username="second")
+        self.post_signed(
+            ready_event("broken", "first", "2024-07-05T19:54:15Z", "north", "-0.033385")
+        )
+        self.post_signed(
+            ready_event(
+                "second", "second", "2024-07-05T19:55:15Z", "51.513863", "-0.033385"
+            )
+        )
+
+        for _ in range(webhooks.MAX_INGEST_ATTEMPTS):
+            call_command("ingest_webhook_events", stdout=StringIO())
+
+        assert Video.objects.filter(cloudflare_uid="second").exists()
+        broken = WebhookEvent.objects.get()
+        assert broken.uid == "broken"
+        assert broken.attempts == webhooks.MAX_INGEST_ATTEMPTS
+        assert "ValueError" in broken.error
+        assert webhooks.drain() == 0
+
+    def test_awards_first_video_around_within_a_batch(self):
+        User.objects.create(username="first")
+        User.objects.create(username="second")
+        self.post_signed(
+            ready_event(
+                "second", "second", "2024-07-05T19:55:15Z", "51.513863", "-0.033385"
+            )
+        )
+        self.post_signed(
+            ready_event(
+                "first", "first", "2024-07-05T19:54:15Z", "51.512863", "-0.033385"
+            )
+        )
+
+        call_command("ingest_webhook_events")
+
+        assert Video.objects.get(cloudflare_uid="first").creators_nearby == 1
+        assert Video.objects.get(cloudflare_uid="second").creators_nearby == 1
+        assert User.objects.get(username="first").points == 1000
+        assert User.objects.get(username="second").points == 0
+
+    def test_rejects_unsigned_events(self):
+        with override_settings(CLOUDFLARE_WEBHOOK_QUEUE=True):
+            response = self.client.post(
+                "/cloudflare-webhook/",
+                data=ready_event(
+                    "first", "first", "2024-07-05T19:54:15Z", "51.512863", "-0.033385"
+                ),
+                format="json",
+            )
+        assert response.status_code == HTTPStatus.FORBIDDEN
+        assert not WebhookEvent.objects.exists()
@@ -0,0 +1,96 @@
+import time
+from http import HTTPStatus
+from unittest import mock
+
+from django.core.cache import cache
+from rest_framework.test import APITestCase
+
+from api import accounts, leaderboard
+from api.models import PointsBucket, User
+
+
+class LeaderboardTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_pages_through_leaderboard(self):
+        user = User.objects.create(username="hello world", display_name="hello")
+        for index in range(24):
+            User.objects.create(username=f"user {index}", points=1000 - index // 2)
+        self.client.force_authenticate(user=user)
+        response = self.client.get("/leaderboard/")
+        assert response.status_code == HTTPStatus.OK
+        assert len(response.data) == 20
+        assert response.data[:3] == [
+            {"rank": 1, "username": "user 0", "display_name": None, "points": 1000},
+            {"rank": 1, "username": "user 1", "display_name": None, "points": 1000},
+            {"rank": 3, "username": "user 2", "display_name": None, "points": 999},
+        ]
+        response = self.client.get(
+            f"/leaderboard/?cursor={response.headers['Next-Cursor']}"
+        )
+        assert response.status_code == HTTPStatus.OK
+        assert "Next-Cursor" not in response.headers
+        assert response.data == [
+            {"rank": 21, "username": "user 20", "display_name": None, "points": 990},
+            {"rank": 21, "username": "user 21", "display_name": None, "points": 990},
+            {"rank": 23, "username": "user 22", "display_name": None, "points": 989},
+            {"rank": 23, "username": "user 23", "display_name": None, "points": 989},
+            {
+                "rank": 25,
+                "username": "hello world",
+                "display_name": "hello",
+                "points": 0,
+            },
+        ]
+
+    def test_cursor_must_be_valid(self):
+        user = User.objects.create(username="hello world")
+        self.client.force_authenticate(user=user)
+        response = self.client.get("/leaderboard/?cursor=not-a-cursor")
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        assert response.data["cursor"][0] == "Invalid cursor"
+
+    def test_leaves_out_deactivated_users(self):
+        user = User.objects.create(username="hello world")
+        leaver = User.objects.create(username="leaver", points=1000)
+        self.client.force_authenticate(user=user)
+        response = self.client.get("/leaderboard/")
+        assert response.data[0]["username"] == "leaver"
+        accounts.request_deletion(leaver)
+        response = self.client.get("/leaderboard/")
+        assert response.status_code == HTTPStatus.OK
+        assert [entry["username"] for entry in response.data] == ["hello world"]
+
+    def test_ranks_agree_with_leaderboard_while_user_awaits_deletion(self):
+        user = User.objects.create(username="hello world", points=500)
+        leaver = User.objects.create(username="leaver", points=1000)
+        self.client.force_authenticate(user=user)
+        assert self.client.get("/rank/").data["rank"] == 2
+        accounts.request_deletion(leaver)
+        assert self.client.get("/rank/").data["rank"] == 1
+        assert self.client.get("/leaderboard/").data[0]["rank"] == 1
+        User.objects.get(pk=leaver.pk).delete()
+        assert dict(PointsBucket.objects.values_list("points", "users")) == {
+            1000: 0,
+            500: 1,
+        }
+
+    def test_serves_stale_snapshot_while_another_worker_refreshes_it(self):
+        user = User.objects.create(username="hello world")
+        self.client.force_authenticate(user=user)
+        self.client.get("/leaderboard/")
+        User.objects.create(username="newcomer", points=1000)
+        cache.add(leaderboard.SNAPSHOT_LOCK_KEY, True)
+        with mock.patch(
+            "api.leaderboard.time.time",
+            return_value=time.time() + leaderboard.SNAPSHOT_TIMEOUT,
+        ):
+            response = self.client.get("/leaderboard/")
+            assert [entry["username"] for entry in response.data] == ["hello world"]
+            cache.delete(leaderboard.SNAPSHOT_LOCK_KEY)
+            response = self.client.get("/leaderboard/")
+            assert [entry["username"] for entry in response.data] == [
+                "newcomer",
+                "hello world",
+            ]
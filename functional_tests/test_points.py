@@ -1,8 +1,10 @@
+from io import StringIO
 from unittest.mock import patch
 
+from django.core.management import call_command
 from rest_framework.test import APITestCase
 
-from api.models import User, Video
+from api.models import User, Video, PointsLedgerEntry
 from api.permissions import IsFromCloudflare
 
 
@@ -354,3 +356,52 @@ class PointsTest(APITestCase):
         assert user.points == 1030
         starring_user = User.objects.get(username=starring_user.username)
         assert starring_user.points == 1030
+
+    @patch.object(IsFromCloudflare, "has_permission")
+    def test_records_and_compacts_points_ledger(self, mock_has_permission):
+        mock_has_permission.return_value = True
+        starring_user = User.objects.create(username="hello")
+        user = User.objects.create(username="0dSkRQUJmuUnf5mdDOUr7bxRP1a2")
+        self.client.post(
+            "/cloudflare-webhook/",
+            data={
+                "uid": "af95bfce3e887accd1fe9796f741b5f1",
+                "thumbnail": "https://customer-ar0494u0olvml2w7.cloudflarestream.com/af95bfce3e887accd1fe9796f741b5f1/thumbnails/thumbnail.jpg",
+                "readyToStream": True,
+                "readyToStreamAt": "2024-07-05T19:54:15.176348Z",
+                "meta": {
+                    "firebase_uid": "0dSkRQUJmuUnf5mdDOUr7bxRP1a2",
+                    "starring_firebase_uid": "hello",
+                    "latitude": "51.512863471620285",
+                    "longitude": "-0.03338590123538324",
+                    "currency": "GBP",
+                    "money_spent": "5.67",
+                },
+                "preview": "https://customer-ar0494u0olvml2w7.cloudflarestream.com/af95bfce3e887accd1fe9796f741b5f1/watch",
+                "playback": {
+                    "hls": "https://customer-ar0494u0olvml2w7.cloudflarestream.com/af95bfce3e887accd1fe9796f741b5f1/manifest/video.m3u8",
+                },
+            },
+            format="json",
+        )
+        video = Video.objects.get(cloudflare_uid="af95bfce3e887accd1fe9796f741b5f1")
+        self.client.force_authenticate(user=User.objects.create(username="visitor"))
+        self.client.patch(f"/video/{str(video.id)}/went/")
+        assert list(
+            PointsLedgerEntry.objects.filter(user=user)
+            .order_by("awarded_at")
+            .values_list("points", "reason", "video")
+        ) == [
+            (1000, PointsLedgerEntry.Reason.FIRST_VIDEO_AROUND, video.id),
+            (10, PointsLedgerEntry.Reason.DIRECTIONS_REQUESTED, video.id),
+        ]
+        output = StringIO()
+        call_command("compact_points_ledger", "--days", "0", "--verify", stdout=output)
+        assert "ledger total" not in output.getvalue()
+        for awarded in [user, starring_user]:
+            assert list(
+                PointsLedgerEntry.objects.filter(user=awarded).values_list(
+                    "points", "reason"
+                )
+            ) == [(1010, PointsLedgerEntry.Reason.COMPACTED)]
+            assert User.objects.get(id=awarded.id).points == 1010
@@ -1,9 +1,11 @@
+from io import StringIO
 from http import HTTPStatus
 from unittest.mock import patch
 
+from django.core.management import call_command
 from rest_framework.test import APITestCase
 
-from api.models import User
+from api.models import User, PointsBucket
 from api.permissions import IsFromCloudflare
 
 
@@ -82,3 +84,15 @@ class UserRankingTest(APITestCase):
         self.client.force_authenticate(user=starring_user)
         response = self.client.get("/rank/")
         assert response.data == {"rank": 1, "points": 1000}
+
+    def test_rebuilds_leaderboard(self):
+        user = User.objects.create(username="hello world", points=10)
+        User.objects.create(username="hello", points=20)
+        User.objects.create(username="goodbye", points=20)
+        PointsBucket.objects.all().delete()
+        self.client.force_authenticate(user=user)
+        response = self.client.get("/rank/")
+        assert response.data == {"rank": 1, "points": 10}
+        call_command("rebuild_leaderboard", stdout=StringIO())
+        response = self.client.get("/rank/")
+        assert response.data == {"rank": 3, "points": 10}
@@ -1,13 +1,20 @@
 import os
 import datetime
+import tempfile
 from http import HTTPStatus
+from io import StringIO
+from unittest import mock
 
+from django.contrib import admin
 from django.contrib.gis.geos import Point
 from django.core import mail
-from django.test.utils import override_settings
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
 from rest_framework.test import APITestCase
 
-from api.models import User, Video
+from api.admin import UserModelAdmin
+from api.models import PointsLedgerEntry, ReportNotification, User, Video
 
 
 # @override_settings(EMAIL_BACKEND="django.core.mail.backends.smtp.EmailBackend")
@@ -53,6 +60,259 @@ class VideoActionsTest(APITestCase):
         assert user2 in video.directions_requested_by.all()
         assert len(video.directions_requested_by.all()) == 2
 
+    def test_interactions_do_not_rewrite_video(self):
+        creator = User.objects.create(username="hello world")
+        user = User.objects.create(username="goodbye world")
+        video = Video.objects.create(
+            cloudflare_uid="af95bfce3e887accd1fe9796f741b5f1",
+            creator=creator,
+            hls="https://customer-ar0494u0olvml2w7.cloudflarestream.com/af95bfce3e887accd1fe9796f741b5f1/manifest/video.m3u8",
+            thumbnail="https://customer-ar0494u0olvml2w7.cloudflarestream.com/af95bfce3e887accd1fe9796f741b5f1/manifest/video.m3u8",
+            preview="https://customer-ar0494u0olvml2w7.cloudflarestream.com/af95bfce3e887accd1fe9796f741b5f1/watch",
+            location=Point(-0.03338590123538324, 51.512863471620285, srid=4326),
+            starring=creator,
+            uploaded_at=datetime.datetime(2024, 1, 1, 1, 1, 1),
+        )
+        self.client.force_authenticate(user=user)
+        with CaptureQueriesContext(connection) as queries:
+            for action in ["went", "went", "hide", "hide"]:
+                response = self.client.patch(f"/video/{str(video.id)}/{action}/")
+                assert response.status_code == HTTPStatus.NO_CONTENT
+        # Only the counters are updated, never the rest of the row.
+        assert not [query for query in queries if '"hls" =' in query["sql"]]
+        assert User.objects.get(username="hello world").points == 10
+        assert video.directions_requested_by.count() == 1
+        assert video.hidden_from.count() == 1
+        video = Video.objects.get(id=video.id)
+        assert video.directions_request_count == 1
+        assert video.hide_count == 1
+        assert video.report_count == 0
+
+    def test_verifies_interaction_counts(self):
+        user = User.objects.create(username="hello world")
+        video = Video.objects.create(
+            cloudflare_uid="af95bfce3e887accd1fe9796f741b5f1",
+            creator=user,
+            hls="https://customer-ar0494u0olvml2w7.cloudflarestream.com/af95bfce3e887accd1fe9796f741b5f1/manifest/video.m3u8",
+            thumbnail="https://customer-ar0494u0olvml2w7.cloudflarestream.com/af95bfce3e887accd1fe9796f741b5f1/manifest/video.m3u8",
+            preview="https://customer-ar0494u0olvml2w7.cloudflarestream.com/af95bfce3e887accd1fe9796f741b5f1/watch",
+            location=Point(-0.03338590123538324, 51.512863471620285, srid=4326),
+            starring=user,
+            uploaded_at=datetime.datetime(2024, 1, 1, 1, 1, 1),
+        )
+        self.client.force_authenticate(user=user)
+        self.client.patch(f"/video/{str(video.id)}/report/")
+        Video.objects.filter(id=video.id).update(report_count=5, hide_count=1)
+        out = StringIO()
+        call_command("verify_video_counts", "--fix", stdout=out)
+        assert f"Video {video.id} has 5 report_count but 1 counted" in out.getvalue()
+        video = Video.objects.get(id=video.id)
+        assert (video.report_count, video.hide_count) == (1, 0)
+        out = StringIO()
+        call_command("verify_video_counts", stdout=out)
+        assert "Video" not in out.getvalue()
+
+    def test_verifies_neighbourhood_counts(self):
+        videos = [
+            Video.objects.create(
+                cloudflare_uid=f"video-{number}",
+                creator=User.objects.create(username=f"creator {number}"),
+                hls="https://customer-ar0494u0olvml2w7.cloudflarestream.com/af95bfce3e887accd1fe9796f741b5f1/manifest/video.m3u8",
+                thumbnail="https://customer-ar0494u0olvml2w7.cloudflarestream.com/af95bfce3e887accd1fe9796f741b5f1/manifest/video.m3u8",
+                preview="https://customer-ar0494u0olvml2w7.cloudflarestream.com/af95bfce3e887accd1fe9796f741b5f1/watch",
+                location=Point(-0.0333859 + number * 0.001, 51.5128634, srid=4326),
+                starring=User.objects.create(username=f"star {number}"),
+                uploaded_at=datetime.datetime(2024, 1, 1, 1, 1, 1),
+                creators_nearby=5,
+            )
+            for number in range(2)
+        ]
+        out = StringIO()
+        call_command("verify_video_counts", "--fix", stdout=out)
+        assert (
+            f"Video {videos[0].id} has 5 creators_nearby but 1 counted"
+            in out.getvalue()
+        )
+        assert list(
+            Video.objects.order_by("cloudflare_uid").values_list(
+                "creators_nearby", flat=True
+            )
+        ) == [1, 1]
+        out = StringIO()
+        call_command("verify_video_counts", stdout=out)
+        assert "Video" not in out.getvalue()
+
+    def test_admin_user_delete_keeps_interaction_counts(self):
+        creator = User.objects.create(username="goodbye world")
+        video = Video.objects.create(
+            cloudflare_uid="af95bfce3e887accd1fe9796f741b5f1",
+            creator=creator,
+            hls="https://customer-ar0494u0olvml2w7.cloudflarestream.com/af95bfce3e887accd1fe9796f741b5f1/manifest/video.m3u8",
+            thumbnail="https://customer-ar0494u0olvml2w7.cloudflarestream.com/af95bfce3e887accd1fe9796f741b5f1/manifest/video.m3u8",
+            preview="https://customer-ar0494u0olvml2w7.cloudflarestream.com/af95bfce3e887accd1fe9796f741b5f1/watch",
+            location=Point(-0.03338590123538324, 51.512863471620285, srid=4326),
+            starring=creator,
+            uploaded_at=datetime.datetime(2024, 1, 1, 1, 1, 1),
+        )
+        user = User.objects.create(username="hello world")
+        self.client.force_authenticate(user=user)
+        self.client.patch(f"/video/{str(video.id)}/report/")
+        self.client.patch(f"/video/{str(video.id)}/went/")
+        with mock.patch("api.admin.delete_user"):
+            UserModelAdmin(User, admin.site).delete_model(None, user)
+        video = Video.objects.get(id=video.id)
+        assert (video.report_count, video.directions_request_count) == (0, 0)
+        out = StringIO()
+        call_command("verify_video_counts", stdout=out)
+        assert "Video" not in out.getvalue()
+
+    def test_applies_queued_interactions_in_bulk(self):
+        user = User.objects.create(username="hello world")
+        creator = User.objects.create(username="goodbye world")
+        videos = [
+            Video.objects.create(
+                cloudflare_uid=f"video-{number}",
+                creator=video_creator,
+                hls="https://customer-ar0494u0olvml2w7.cloudflarestream.com/af95bfce3e887accd1fe9796f741b5f1/manifest/video.m3u8",
+                thumbnail="https://customer-ar0494u0olvml2w7.cloudflarestream.com/af95bfce3e887accd1fe9796f741b5f1/manifest/video.m3u8",
+                preview="https://customer-ar0494u0olvml2w7.cloudflarestream.com/af95bfce3e887accd1fe9796f741b5f1/watch",
+                location=Point(-0.03338590123538324, 51.512863471620285, srid=4326),
+                starring=video_creator,
+                uploaded_at=datetime.datetime(2024, 1, 1, 1, 1, 1),
+            )
+            for number, video_creator in enumerate([creator, creator, user])
+        ]
+        missing_video = "9a8b1f6e-43f8-4ac0-9b7b-27a0c1e6d5d2"
+        self.client.force_authenticate(user=user)
+        response = self.client.post(
+            "/video/interactions/",
+            {
+                "interactions": [
+                    {"video": str(videos[0].id), "action": "went"},
+                    {"video": str(videos[0].id), "action": "hide"},
+                    {"video": str(videos[1].id), "action": "report"},
+                    {"video": str(videos[1].id), "action": "block"},
+                    {"video": str(videos[2].id), "action": "block"},
+                    {"video": missing_video, "action": "went"},
+                ]
+            },
+            format="json",
+        )
+        assert response.status_code == HTTPStatus.OK
+        assert [item["result"] for item in response.data] == [
+            "recorded",
+            "recorded",
+            "recorded",
+            "recorded",
+            "invalid",
+            "not_found",
+        ]
+        assert User.objects.get(username="goodbye world").points == 10
+        assert user.blocked_users.all().first() == creator
+        assert ReportNotification.objects.get().video == videos[1]
+        videos[0].refresh_from_db()
+        assert (videos[0].directions_request_count, videos[0].hide_count) == (1, 1)
+        response = self.client.post(
+            "/video/interactions/",
+            {"interactions": [{"video": str(videos[0].id), "action": "went"}]},
+            format="json",
+        )
+        assert response.data[0]["result"] == "unchanged"
+        assert User.objects.get(username="goodbye world").points == 10
+
+    def test_pages_blocked_creator_video_ids(self):
+        bad_user = User.objects.create(username="hello world")
+        videos = [
+            Video.objects.create(
+                cloudflare_uid=f"video-{day}",
+                creator=bad_user,
+                hls="https://customer-ar0494u0olvml2w7.cloudflarestream.com/af95bfce3e887accd1fe9796f741b5f1/manifest/video.m3u8",
+                thumbnail="https://customer-ar0494u0olvml2w7.cloudflarestream.com/af95bfce3e887accd1fe9796f741b5f1/manifest/video.m3u8",
+                preview="https://customer-ar0494u0olvml2w7.cloudflarestream.com/af95bfce3e887accd1fe9796f741b5f1/watch",
+                location=Point(-0.03338590123538324, 51.512863471620285, srid=4326),
+                starring=bad_user,
+                uploaded_at=datetime.datetime(
+                    2024, 1, day, tzinfo=datetime.timezone.utc
+                ),
+            )
+            for day in range(1, 6)
+        ]
+        newest_first = [str(video.id) for video in reversed(videos)]
+        user = User.objects.create(username="goodbye world")
+        self.client.force_authenticate(user=user)
+        response = self.client.patch(f"/video/{videos[0].id}/block/?limit=2")
+        assert response.status_code == HTTPStatus.OK
+        assert [str(video_id) for video_id in response.data] == newest_first[:2]
+        cursor = response.headers["Next-Cursor"]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                f"/video/{videos[0].id}/creator-videos/?limit=2&cursor={cursor}"
+            )
+        assert response.status_code == HTTPStatus.OK
+        assert [str(video_id) for video_id in response.data] == newest_first[2:4]
+        assert not [query for query in queries if not query["sql"].startswith("SELECT")]
+        other_video = Video.objects.create(
+            cloudflare_uid="other",
+            creator=user,
+            hls=videos[0].hls,
+            thumbnail=videos[0].thumbnail,
+            preview=videos[0].preview,
+            location=videos[0].location,
+            starring=user,
+            uploaded_at=videos[0].uploaded_at,
+        )
+        response = self.client.get(
+            f"/video/{other_video.id}/creator-videos/?limit=2&cursor={cursor}"
+        )
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        assert response.data["cursor"][0] == "Cursor is for another creator"
+        response = self.client.patch(
+            f"/video/{videos[0].id}/block/?since=2024-01-03T00:00:00Z"
+        )
+        assert [str(video_id) for video_id in response.data] == newest_first[:2]
+        assert "Next-Cursor" not in response.headers
+
+    def test_awards_queued_directions_requests_in_bulk(self):
+        user = User.objects.create(username="hello world")
+        creators = [User.objects.create(username=f"creator-{n}") for n in range(4)]
+        videos = [
+            Video.objects.create(
+                cloudflare_uid=f"video-{number}",
+                creator=creator,
+                hls="https://customer-ar0494u0olvml2w7.cloudflarestream.com/af95bfce3e887accd1fe9796f741b5f1/manifest/video.m3u8",
+                thumbnail="https://customer-ar0494u0olvml2w7.cloudflarestream.com/af95bfce3e887accd1fe9796f741b5f1/manifest/video.m3u8",
+                preview="https://customer-ar0494u0olvml2w7.cloudflarestream.com/af95bfce3e887accd1fe9796f741b5f1/watch",
+                location=Point(-0.03338590123538324, 51.512863471620285, srid=4326),
+                starring=creator,
+                uploaded_at=datetime.datetime(2024, 1, 1, 1, 1, 1),
+            )
+            for number, creator in enumerate(creators)
+        ]
+        self.client.force_authenticate(user=user)
+        with CaptureQueriesContext(connection) as single:
+            self.client.post(
+                "/video/interactions/",
+                {"interactions": [{"video": str(videos[0].id), "action": "went"}]},
+                format="json",
+            )
+        # Three times the directions requests take no more queries than one.
+        with self.assertNumQueries(len(single)):
+            response = self.client.post(
+                "/video/interactions/",
+                {
+                    "interactions": [
+                        {"video": str(video.id), "action": "went"}
+                        for video in videos[1:]
+                    ]
+                },
+                format="json",
+            )
+        assert [item["result"] for item in response.data] == ["recorded"] * 3
+        assert [User.objects.get(id=creator.id).points for creator in creators] == [
+            10
+        ] * 4
+        assert PointsLedgerEntry.objects.count() == 4
+
     def test_reports_video(self):
         user = User.objects.create(username="hello world")
         starring_user = User.objects.create(username="hello")
@@ -98,6 +358,8 @@ class VideoActionsTest(APITestCase):
             f"/video/?latitude={current_latitude}&longitude={current_longitude}"
         )
         assert response.data["features"][-1]["id"] == bad_video_id
+        assert not mail.outbox
+        call_command("send_report_digests", stdout=StringIO())
         assert len(mail.outbox) == 1
         assert mail.outbox[0].subject == "Video reported"
         assert mail.outbox[0].to == [os.environ.get("EMAIL_HOST_USER")]
@@ -106,6 +368,37 @@ class VideoActionsTest(APITestCase):
             == f"FlitFlok <{os.environ.get('EMAIL_HOST_USER')}>"
         )
 
+    def test_groups_reports_of_a_video_into_one_email(self):
+        creator = User.objects.create(username="hello")
+        video = Video.objects.create(
+            cloudflare_uid="af95bfce3e887accd1fe9796f741b5f1",
+            creator=creator,
+            hls="https://customer-ar0494u0olvml2w7.cloudflarestream.com/af95bfce3e887accd1fe9796f741b5f1/manifest/video.m3u8",
+            thumbnail="https://customer-ar0494u0olvml2w7.cloudflarestream.com/af95bfce3e887accd1fe9796f741b5f1/manifest/video.m3u8",
+            preview="https://customer-ar0494u0olvml2w7.cloudflarestream.com/af95bfce3e887accd1fe9796f741b5f1/watch",
+            location=Point(-0.03338590123538324, 51.512863471620285, srid=4326),
+            starring=creator,
+            uploaded_at=datetime.datetime(2024, 1, 1, 1, 1, 1),
+        )
+        for username in ["hello world", "goodbye world", "hello world"]:
+            user, _ = User.objects.get_or_create(username=username)
+            self.client.force_authenticate(user=user)
+            response = self.client.patch(f"/video/{video.id}/report/")
+            assert response.status_code == HTTPStatus.NO_CONTENT
+        assert video.reported_by.count() == 2
+        with tempfile.TemporaryDirectory() as spool, override_settings(
+            EMAIL_BACKEND="django.core.mail.backends.filebased.EmailBackend",
+            EMAIL_FILE_PATH=spool,
+        ):
+            call_command("send_report_digests", stdout=StringIO())
+            call_command("send_report_digests", stdout=StringIO())
+            (spooled,) = os.listdir(spool)
+            with open(os.path.join(spool, spooled)) as email:
+                digest = email.read()
+        assert digest.count("Subject: Video reported") == 1
+        assert f"PK: {video.id}" in digest
+        assert "Reports: 2" in digest
+
     def test_hides_video(self):
         user = User.objects.create(username="hello world")
         starring_user = User.objects.create(username="hello")
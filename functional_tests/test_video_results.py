@@ -3,8 +3,11 @@ import uuid
 from http import HTTPStatus
 from unittest.mock import patch
 
+from django.contrib.gis.geos import Point
+from django.core.cache import caches
 from rest_framework.test import APITestCase
 
+from api.feed import exclusions_key, feed_exclusions
 from api.models import User, Video
 from api.permissions import IsFromCloudflare
 
@@ -907,3 +910,154 @@ class VideoResultsTest(APITestCase):
         assert response.status_code == HTTPStatus.BAD_REQUEST
         assert set(response.data) == {"current_video"}
         assert response.data["current_video"][0] == "Current video does not exist"
+
+    def test_pages_through_tied_videos_with_cursor(self):
+        user = User.objects.create(username="hello world")
+        starring_user = User.objects.create(username="hello")
+        self.client.force_authenticate(user=user)
+        for day in range(1, 8):
+            Video.objects.create(
+                cloudflare_uid=f"{day}f95bfce3e887accd1fe9796f741b5f1",
+                creator=user,
+                hls="https://customer-ar0494u0olvml2w7.cloudflarestream.com/af95bfce3e887accd1fe9796f741b5f1/manifest/video.m3u8",
+                thumbnail="https://customer-ar0494u0olvml2w7.cloudflarestream.com/af95bfce3e887accd1fe9796f741b5f1/thumbnails/thumbnail.jpg",
+                preview="https://customer-ar0494u0olvml2w7.cloudflarestream.com/af95bfce3e887accd1fe9796f741b5f1/watch",
+                location=Point(-0.03338590123538324, 51.512863471620285, srid=4326),
+                starring=starring_user,
+                uploaded_at=datetime.datetime(
+                    2024, 1, 1 + day // 2, tzinfo=datetime.timezone.utc
+                ),
+            )
+        current_latitude = 51.51291201050047
+        current_longitude = -0.0333876462451904
+        response = self.client.get(
+            f"/video/?latitude={current_latitude}&longitude={current_longitude}"
+        )
+        assert response.status_code == HTTPStatus.OK
+        first_page = [video["id"] for video in response.data["features"]]
+        assert len(first_page) == 5
+        response = self.client.get(
+            f"/video/?latitude={current_latitude}&longitude={current_longitude}"
+            f"&cursor={response.headers['Next-Cursor']}"
+        )
+        assert response.status_code == HTTPStatus.OK
+        assert "Next-Cursor" not in response.headers
+        second_page = [video["id"] for video in response.data["features"]]
+        assert len(second_page) == 2
+        assert first_page + second_page == [
+            str(video.id) for video in Video.objects.order_by("-uploaded_at", "id")
+        ]
+
+    def test_cursor_must_be_valid(self):
+        user = User.objects.create(username="hello world")
+        self.client.force_authenticate(user=user)
+        current_latitude = 51.51291201050047
+        current_longitude = -0.0333876462451904
+        response = self.client.get(
+            f"/video/?latitude={current_latitude}&longitude={current_longitude}"
+            f"&cursor=not-a-cursor"
+        )
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        assert set(response.data) == {"cursor"}
+        assert response.data["cursor"][0] == "Invalid cursor"
+
+    @patch.object(IsFromCloudflare, "has_permission")
+    def test_finds_videos_ingested_after_area_was_cached(self, mock_has_permission):
+        mock_has_permission.return_value = True
+        user = User.objects.create(username="hello world")
+        User.objects.create(username="hello")
+        self.client.force_authenticate(user=user)
+        current_latitude = 51.51291201050047
+        current_longitude = -0.0333876462451904
+        response = self.client.get(
+            f"/video/?latitude={current_latitude}&longitude={current_longitude}"
+        )
+        assert response.data == {
+            "type": "FeatureCollection",
+            "features": [],
+        }
+        self.client.post(
+            "/cloudflare-webhook/",
+            data={
+                "uid": "af95bfce3e887accd1fe9796f741b5f1",
+                "thumbnail": "https://customer-ar0494u0olvml2w7.cloudflarestream.com/af95bfce3e887accd1fe9796f741b5f1/thumbnails/thumbnail.jpg",
+                "readyToStream": True,
+                "readyToStreamAt": "2024-07-05T19:54:15.176348Z",
+                "meta": {
+                    "firebase_uid": user.username,
+                    "starring_firebase_uid": "hello",
+                    "latitude": "51.51291201050047",
+                    "longitude": "-0.0333876462451904",
+                    "currency": "GBP",
+                    "money_spent": "5.67",
+                },
+                "preview": "https://customer-ar0494u0olvml2w7.cloudflarestream.com/af95bfce3e887accd1fe9796f741b5f1/watch",
+                "playback": {
+                    "hls": "https://customer-ar0494u0olvml2w7.cloudflarestream.com/af95bfce3e887accd1fe9796f741b5f1/manifest/video.m3u8",
+                },
+            },
+            format="json",
+        )
+        response = self.client.get(
+            f"/video/?latitude={current_latitude}&longitude={current_longitude}"
+        )
+        assert [video["id"] for video in response.data["features"]] == [
+            str(Video.objects.get(cloudflare_uid="af95bfce3e887accd1fe9796f741b5f1").id)
+        ]
+
+    def test_page_costs_constant_number_of_queries(self):
+        user = User.objects.create(username="hello world")
+        self.client.force_authenticate(user=user)
+        for index in range(5):
+            starring_user = User.objects.create(username=f"hello {index}")
+            Video.objects.create(
+                cloudflare_uid=f"{index}f95bfce3e887accd1fe9796f741b5f1",
+                creator=user,
+                hls="https://customer-ar0494u0olvml2w7.cloudflarestream.com/af95bfce3e887accd1fe9796f741b5f1/manifest/video.m3u8",
+                thumbnail="https://customer-ar0494u0olvml2w7.cloudflarestream.com/af95bfce3e887accd1fe9796f741b5f1/thumbnails/thumbnail.jpg",
+                preview="https://customer-ar0494u0olvml2w7.cloudflarestream.com/af95bfce3e887accd1fe9796f741b5f1/watch",
+                location=Point(-0.03338590123538324, 51.512863471620285, srid=4326),
+                starring=starring_user,
+                uploaded_at=datetime.datetime(
+                    2024, 1, 1 + index, tzinfo=datetime.timezone.utc
+                ),
+            )
+        current_latitude = 51.51291201050047
+        current_longitude = -0.0333876462451904
+        self.client.get(
+            f"/video/?latitude={current_latitude}&longitude={current_longitude}"
+        )
+        # Cached video set version and exclusions, then the ranked page.
+        with self.assertNumQueries(3):
+            response = self.client.get(
+                f"/video/?latitude={current_latitude}&longitude={current_longitude}"
+            )
+        assert len(response.data["features"]) == 5
+        assert [
+            video["properties"]["starring_rank"] for video in response.data["features"]
+        ] == [1] * 5
+
+    def test_racing_read_cannot_recache_forgotten_exclusions(self):
+        user = User.objects.create(username="hello world")
+        creator = User.objects.create(username="hello")
+        self.client.force_authenticate(user=user)
+        video = Video.objects.create(
+            cloudflare_uid="af95bfce3e887accd1fe9796f741b5f1",
+            creator=creator,
+            hls="https://customer-ar0494u0olvml2w7.cloudflarestream.com/af95bfce3e887accd1fe9796f741b5f1/manifest/video.m3u8",
+            thumbnail="https://customer-ar0494u0olvml2w7.cloudflarestream.com/af95bfce3e887accd1fe9796f741b5f1/thumbnails/thumbnail.jpg",
+            preview="https://customer-ar0494u0olvml2w7.cloudflarestream.com/af95bfce3e887accd1fe9796f741b5f1/watch",
+            location=Point(-0.03338590123538324, 51.512863471620285, srid=4326),
+            starring=creator,
+            uploaded_at=datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc),
+        )
+        # Read before the hide commits, and cached once it has.
+        stale = feed_exclusions(user)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(f"/video/{video.id}/hide/")
+        assert response.status_code == HTTPStatus.NO_CONTENT
+        caches["exclusions"].set(exclusions_key(user.pk), stale)
+        response = self.client.get(
+            "/video/?latitude=51.51291201050047&longitude=-0.0333876462451904"
+        )
+        assert response.data["features"] == []
@@ -4,6 +4,7 @@ import requests
 from firebase_admin import auth
 from rest_framework.test import APITestCase
 
+from api.firebase import firebase_app
 from api.models import User
 from http import HTTPStatus
 
@@ -38,7 +39,7 @@ class VideoUploadTest(APITestCase):
             requests.request("DELETE", url, headers=headers)
 
     def test_must_be_verified_to_upload(self):
-        firebase_user = auth.create_user()
+        firebase_user = auth.create_user(app=firebase_app())
         uid = firebase_user.uid
         user = User.objects.create(username=uid)
         self.client.force_authenticate(user=user)
@@ -47,7 +48,16 @@ class VideoUploadTest(APITestCase):
         )
         assert response.status_code == HTTPStatus.BAD_REQUEST
         assert response.data["creator"][0] == "Verified email address required"
-        auth.delete_user(uid)
+        auth.delete_user(uid, app=firebase_app())
+
+    def test_must_have_verified_email_claim_to_upload(self):
+        user = User.objects.create(username="zVAvUkRbSbgZCSnZ64hU9PyutCi1")
+        self.client.force_authenticate(user=user, token={"email_verified": False})
+        response = self.client.post(
+            "/video-upload/",
+        )
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        assert response.data["creator"][0] == "Verified email address required"
 
     def test_upload_length_must_be_positive_integer(self):
         user = User.objects.create(username="zVAvUkRbSbgZCSnZ64hU9PyutCi1")
@@ -1,5 +1,6 @@
 #!/bin/sh
 python manage.py makemigrations api
 python manage.py migrate
+python manage.py createcachetable
 python manage.py collectstatic --no-input
 gunicorn --bind 0.0.0.0:"$PORT" server.wsgi:application
\ No newline at end of file
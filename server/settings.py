@@ -9,6 +9,7 @@ https://docs.djangoproject.com/en/4.2/topics/settings/
 For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
+
 import os
 from pathlib import Path
 
@@ -92,6 +93,45 @@ db_config = dj_database_url.config(conn_max_age=600)
 db_config["ENGINE"] = "django.contrib.gis.db.backends.postgis"
 DATABASES = {"default": db_config}
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+# The shared database cache only holds a handful of app-wide keys, such as
+# the feed's video set version and the leaderboard snapshot. Per-user entries
+# go in caches of their own, so the table never grows large enough to cull.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+        "LOCATION": "cache",
+        "OPTIONS": {"MAX_ENTRIES": 1000},
+    },
+    "feed": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "feed",
+        "TIMEOUT": 300,
+        "OPTIONS": {"MAX_ENTRIES": 1000},
+    },
+    # Per-user feed exclusions are shared by all workers, in a table of their
+    # own so culling them never touches the default cache.
+    "exclusions": {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+        "LOCATION": "feed_exclusions",
+        "TIMEOUT": 60 * 60 * 24,
+        "OPTIONS": {"MAX_ENTRIES": 100000},
+    },
+    "principals": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "principals",
+        "TIMEOUT": 300,
+        "OPTIONS": {"MAX_ENTRIES": 10000},
+    },
+    "firebase": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "firebase",
+        "OPTIONS": {"MAX_ENTRIES": 10000},
+    },
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -156,7 +196,16 @@ REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": ("api.authentication.FirebaseAuthentication",),
 }
 
-EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
+# Acknowledge Cloudflare webhooks once queued, for ingest_webhook_events to
+# ingest in batches.
+CLOUDFLARE_WEBHOOK_QUEUE = os.environ.get("CLOUDFLARE_WEBHOOK_QUEUE") == "True"
+
+EMAIL_FILE_PATH = os.environ.get("EMAIL_FILE_PATH")
+if EMAIL_FILE_PATH:
+    # Spool emails to files instead of sending them, for local testing.
+    EMAIL_BACKEND = "django.core.mail.backends.filebased.EmailBackend"
+else:
+    EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
 EMAIL_HOST = "smtp.office365.com"
 EMAIL_HOST_USER = os.environ.get("EMAIL_HOST_USER")
 DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
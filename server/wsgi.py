@@ -14,3 +14,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "server.settings")
 
 application = get_wsgi_application()
+
+# Fetch token signing keys while the worker boots rather than on its first
+# authenticated request.
+from api.authentication import firebase_tokens  # noqa: E402
+
+firebase_tokens.start()